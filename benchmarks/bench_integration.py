@@ -0,0 +1,198 @@
+"""Benchmark the integration against the local stub controller.
+
+Each scenario sets up the integration from this checkout in a test instance of
+Home Assistant against a stub controller with one synthetic house, then
+measures:
+
+- setup time of the config entry, cold (first poll) and warm (stored data)
+- update cycle time per poll while a share of the rooms changes
+- state writes per poll, as counted by the coordinator and as state changes
+- peak Python memory of setup and polls, in a separate pass with tracemalloc
+- throughput of bulk target writes through the ``controme.set_targets`` service
+
+Run it through ``benchmarks/run.py``, which writes the results as JSON.
+"""
+import asyncio
+import gc
+import json
+import statistics
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import EVENT_HOMEASSISTANT_FINAL_WRITE, EVENT_STATE_CHANGED
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+
+from conftest import HOUSE_ID
+from stub_controller import STUB_PASSWORD, STUB_USER, StubController
+
+DOMAIN = "controme"
+# Polls are spaced to stay within the request rate limit of the integration,
+# otherwise the cycle times would measure the wait for the scheduler
+POLL_PAUSE = 0.25
+
+
+def _summary(samples: List[float]) -> Dict[str, Optional[float]]:
+    """Return the median, 95th percentile and maximum of samples."""
+    if not samples:
+        return {"p50": None, "p95": None, "max": None}
+    ordered = sorted(samples)
+    return {
+        "p50": statistics.median(ordered),
+        "p95": ordered[min(round(0.95 * (len(ordered) - 1)), len(ordered) - 1)],
+        "max": ordered[-1],
+    }
+
+
+def _add_entry(hass: HomeAssistant, controller: StubController) -> MockConfigEntry:
+    """Add a config entry for the stub controller."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title=f"Controme ({controller.url})",
+        data={
+            "api_url": controller.url,
+            "user": STUB_USER,
+            "password": STUB_PASSWORD,
+            "haus_ids": [str(house_id) for house_id in controller.houses],
+        },
+    )
+    entry.add_to_hass(hass)
+    return entry
+
+
+def _coordinator(hass: HomeAssistant, entry: MockConfigEntry):
+    """Return the coordinator of a loaded entry."""
+    return hass.data[DOMAIN][entry.entry_id]["coordinator"]
+
+
+async def _async_timed(coro) -> float:
+    """Await a coroutine and return its duration in milliseconds."""
+    start_time = time.perf_counter()
+    await coro
+    return (time.perf_counter() - start_time) * 1000
+
+
+async def _async_setup(hass: HomeAssistant, entry: MockConfigEntry) -> None:
+    """Set up an entry and wait for its entities."""
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def test_update_cycle(
+    hass: HomeAssistant,
+    controller: StubController,
+    options: Any,
+    scenario: Dict[str, Any],
+) -> None:
+    """Measure setup, polls and writes for a house of the given size."""
+    state_changes = 0
+
+    @callback
+    def _count_state_change(_event: Event) -> None:
+        nonlocal state_changes
+        state_changes += 1
+
+    hass.bus.async_listen(EVENT_STATE_CHANGED, _count_state_change)
+
+    # Cold setup, the first poll runs before the entities are added
+    entry = _add_entry(hass, controller)
+    cold_setup = await _async_timed(_async_setup(hass, entry))
+    assert entry.state is ConfigEntryState.LOADED
+    entities = len(er.async_entries_for_config_entry(er.async_get(hass), entry.entry_id))
+
+    # Warm setup from the stored payload, the first poll runs in the background
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_FINAL_WRITE)
+    await hass.async_block_till_done()
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    warm_setup = await _async_timed(_async_setup(hass, entry))
+    # Let the background refresh of the warm start finish
+    await asyncio.sleep(POLL_PAUSE)
+    await hass.async_block_till_done(wait_background_tasks=True)
+    coordinator = _coordinator(hass, entry)
+
+    # Polls with a share of the rooms changing before each
+    cycle_times: List[float] = []
+    state_writes: List[int] = []
+    state_changes_per_poll: List[int] = []
+
+    async def _async_poll() -> None:
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+
+    for _ in range(options.polls):
+        await asyncio.sleep(POLL_PAUSE)
+        controller.mutate(options.change_ratio)
+        state_changes = 0
+        cycle_times.append(await _async_timed(_async_poll()))
+        assert coordinator.last_update_success
+        state_writes.append(coordinator.metrics.cycles[-1].state_writes or 0)
+        state_changes_per_poll.append(state_changes)
+
+    # Bulk writes through the service, one target per room
+    targets = {
+        f"{HOUSE_ID}/{room_id}": 21.5
+        for room_id in list(controller.houses[HOUSE_ID].rooms)[: options.writes]
+    }
+    write_time = await _async_timed(hass.services.async_call(
+        DOMAIN,
+        "set_targets",
+        {"targets": targets},
+        blocking=True,
+        return_response=True,
+    ))
+    request_times = [
+        write.request for write in coordinator.metrics.writes if write.request is not None
+    ]
+
+    scenario.update({
+        "return_sensors": options.return_sensors,
+        "entities": entities,
+        "payload_size": len(json.dumps(controller.houses[HOUSE_ID].floors)),
+        "setup_ms": {"cold": cold_setup, "warm": warm_setup},
+        "poll_ms": _summary(cycle_times),
+        "state_writes_per_poll": _summary(state_writes),
+        "state_changes_per_poll": _summary(state_changes_per_poll),
+        "coordinator_metrics": coordinator.metrics.as_dict(),
+        "writes": {
+            "count": len(targets),
+            "total_ms": write_time,
+            "per_second": len(targets) / (write_time / 1000) if write_time else None,
+            "request_ms": _summary(request_times),
+            "scheduler": coordinator.scheduler.metrics,
+        },
+        "requests": dict(controller.requests),
+    })
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def test_peak_memory(
+    hass: HomeAssistant,
+    controller: StubController,
+    options: Any,
+    scenario: Dict[str, Any],
+) -> None:
+    """Measure the peak of Python allocations during setup and polls, in bytes."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        entry = _add_entry(hass, controller)
+        await _async_setup(hass, entry)
+        coordinator = _coordinator(hass, entry)
+        for _ in range(min(options.polls, 5)):
+            await asyncio.sleep(POLL_PAUSE)
+            controller.mutate(options.change_ratio)
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    scenario["peak_memory"] = peak
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
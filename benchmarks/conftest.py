@@ -0,0 +1,148 @@
+"""Options, fixtures and the result file of the benchmarks."""
+from datetime import datetime, timezone
+import json
+import os
+from pathlib import Path
+import platform
+import subprocess
+import sys
+from typing import Any, Dict, Optional
+
+import pytest
+
+from homeassistant.const import __version__ as HA_VERSION
+
+from stub_controller import StubController
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+# Home Assistant imports custom integrations from its configuration directory
+# unless the package is imported already, so the checkout is imported first
+sys.path.insert(0, str(REPO_ROOT))
+import custom_components  # noqa: E402,F401
+
+DEFAULT_ROOM_COUNTS = [1, 10, 100, 500, 1000, 2000]
+HOUSE_ID = 1
+
+RESULTS = pytest.StashKey[Dict[str, Any]]()
+
+
+def _git_revision() -> Optional[str]:
+    """Return the checked out revision of the repository."""
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    """Add the parameters of the scenarios."""
+    group = parser.getgroup("controme", "Controme benchmarks")
+    group.addoption("--rooms", type=int, nargs="+", default=DEFAULT_ROOM_COUNTS,
+                    help="room counts of the synthetic house, one scenario each")
+    group.addoption("--return-sensors", type=int, default=1, help="return sensors per room")
+    group.addoption("--latency", type=float, default=0.0,
+                    help="seconds the stub controller waits before each answer")
+    group.addoption("--polls", type=int, default=20, help="polls per scenario")
+    group.addoption("--change-ratio", type=float, default=0.1,
+                    help="share of rooms whose temperature changes before each poll")
+    group.addoption("--writes", type=int, default=20, help="rooms written per scenario")
+    group.addoption("--no-memory", action="store_true", help="skip the memory pass")
+    group.addoption("--output", type=Path, default=Path("benchmark-results.json"))
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    """Start the result file."""
+    config.stash[RESULTS] = {
+        "started": datetime.now(timezone.utc).isoformat(),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "homeassistant": HA_VERSION,
+        "parameters": {
+            name: config.getoption(name)
+            for name in ("rooms", "return_sensors", "latency", "polls",
+                         "change_ratio", "writes", "no_memory")
+        },
+        "scenarios": {},
+    }
+
+
+def pytest_generate_tests(metafunc: pytest.Metafunc) -> None:
+    """Run each benchmark once per room count."""
+    if "rooms" in metafunc.fixturenames:
+        rooms = metafunc.config.getoption("rooms")
+        metafunc.parametrize("rooms", rooms, ids=[f"{count}-rooms" for count in rooms])
+
+
+def pytest_collection_modifyitems(config: pytest.Config, items: list) -> None:
+    """Leave out the memory pass if asked to."""
+    if config.getoption("no_memory"):
+        items[:] = [item for item in items if "peak_memory" not in item.name]
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations: None) -> None:
+    """Load the integration from the checkout."""
+
+
+@pytest.fixture
+def options(request: pytest.FixtureRequest) -> Any:
+    """Return the parameters of the scenarios."""
+    return request.config.option
+
+
+@pytest.fixture
+def scenario(request: pytest.FixtureRequest, rooms: int) -> Dict[str, Any]:
+    """Return the results of the scenario with the given room count."""
+    scenarios = request.config.stash[RESULTS]["scenarios"]
+    return scenarios.setdefault(rooms, {"rooms": rooms})
+
+
+@pytest.fixture
+async def controller(socket_enabled: None, options: Any, rooms: int) -> StubController:
+    """Serve a synthetic house of the given size."""
+    controller = StubController(
+        {HOUSE_ID: rooms}, return_sensors=options.return_sensors, latency=options.latency
+    )
+    await controller.start()
+    yield controller
+    await controller.stop()
+
+
+def pytest_sessionfinish(session: pytest.Session) -> None:
+    """Write the results of all scenarios."""
+    results = session.config.stash.get(RESULTS, None)
+    if not results or not results["scenarios"]:
+        return
+    output = {**results, "scenarios": list(results["scenarios"].values())}
+    session.config.getoption("output").write_text(
+        json.dumps(output, indent=2, default=str) + os.linesep
+    )
+
+
+def pytest_terminal_summary(terminalreporter: Any, config: pytest.Config) -> None:
+    """Print one line per scenario."""
+    results = config.stash.get(RESULTS, None)
+    if not results or not results["scenarios"]:
+        return
+    terminalreporter.section("Controme benchmarks")
+    terminalreporter.write_line(
+        f"Home Assistant {results['homeassistant']}, Python {results['python']}, "
+        f"revision {results['revision']}"
+    )
+    for scenario in results["scenarios"].values():
+        if "poll_ms" not in scenario:
+            continue
+        line = (
+            f"{scenario['rooms']:>5} rooms: setup {scenario['setup_ms']['cold']:.0f} ms "
+            f"(warm {scenario['setup_ms']['warm']:.0f} ms), "
+            f"poll p50 {scenario['poll_ms']['p50']:.1f} ms, "
+            f"{scenario['state_writes_per_poll']['p50']:.0f} state writes per poll, "
+            f"{scenario['writes']['per_second']:.1f} writes/s"
+        )
+        if "peak_memory" in scenario:
+            line += f", peak memory {scenario['peak_memory'] / 2**20:.1f} MiB"
+        terminalreporter.write_line(line)
+    terminalreporter.write_line(f"Results written to {config.getoption('output')}")
@@ -0,0 +1,28 @@
+"""Run the benchmarks and write the results as JSON for comparison across versions.
+
+    python benchmarks/run.py --rooms 1 100 2000 --output results.json
+
+The scenarios are in bench_integration.py and run on the test instance of
+Home Assistant from pytest-homeassistant-custom-component. All options of
+pytest and of the scenarios (see ``--help``) are passed through.
+"""
+from pathlib import Path
+import sys
+
+import pytest
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+
+
+def main() -> int:
+    """Run the benchmarks from the command line."""
+    return pytest.main([
+        str(BENCHMARKS_DIR / "bench_integration.py"),
+        "--rootdir", str(BENCHMARKS_DIR),
+        "-c", str(BENCHMARKS_DIR / "pytest.ini"),
+        *sys.argv[1:],
+    ])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""Local stand-in for a Controme controller with synthetic houses.
+
+Serves the endpoints the integration uses:
+
+- ``GET  /get/json/v1/{haus}/temps/`` with all floors and rooms of a house
+- ``GET  /get/json/v1/{haus}/temps/{raum}/`` with a single room
+- ``POST /set/json/v1/{haus}/soll/{raum}/`` to set a target temperature
+- ``GET  /accounts/m_login/`` with the login page used to recognize a controller
+
+Run it on its own to point a development instance of Home Assistant at it:
+
+    python benchmarks/stub_controller.py --rooms 200 --return-sensors 2 --port 8080
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+_LOGGER = logging.getLogger(__name__)
+
+STUB_USER = "benchmark"
+STUB_PASSWORD = "benchmark"
+
+# Rooms per floor of the synthetic houses
+ROOMS_PER_FLOOR = 20
+
+LOGIN_PAGE = (
+    "<!DOCTYPE html><html><head><title>Smart-Heat-OS - Login</title></head>"
+    "<body><form method=\"post\"></form></body></html>"
+)
+
+
+class SyntheticHouse:
+    """Floors and rooms of a generated house."""
+
+    def __init__(self, house_id: int, rooms: int, return_sensors: int, rng: random.Random) -> None:
+        """Generate the house."""
+        self.id = house_id
+        self.floors: List[Dict[str, Any]] = []
+        # Rooms by their id, shared with the floor payloads
+        self.rooms: Dict[int, Dict[str, Any]] = {}
+        for index in range(rooms):
+            if index % ROOMS_PER_FLOOR == 0:
+                floor_id = len(self.floors) + 1
+                self.floors.append({
+                    "id": floor_id,
+                    "etagenname": f"Etage {floor_id}",
+                    "raeume": [],
+                })
+            room_id = house_id * 10000 + index + 1
+            room = {
+                "id": room_id,
+                "name": f"Raum {room_id}",
+                "temperatur": round(rng.uniform(17, 23), 2),
+                "solltemperatur": 21.0,
+                "luftfeuchte": rng.randint(35, 60),
+                "total_offset": 0.0,
+                "betriebsart": "heating",
+                "sensoren": [
+                    {
+                        "name": f"{room_id}_rl{sensor}",
+                        "beschreibung": f"Rücklauf Heizkreis {sensor + 1}",
+                        "wert": round(rng.uniform(25, 35), 2),
+                    }
+                    for sensor in range(return_sensors)
+                ],
+            }
+            self.floors[-1]["raeume"].append(room)
+            self.rooms[room_id] = room
+
+
+class StubController:
+    """Synthetic controller serving the Controme JSON API."""
+
+    def __init__(
+        self,
+        houses: Dict[int, int],
+        return_sensors: int = 1,
+        latency: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        """Generate the houses, given as house id -> number of rooms."""
+        self._rng = random.Random(seed)
+        self.houses = {
+            house_id: SyntheticHouse(house_id, rooms, return_sensors, self._rng)
+            for house_id, rooms in houses.items()
+        }
+        # Delay before each answer, like a controller on a slow network
+        self.latency = latency
+        self.requests: Dict[str, int] = {"temps": 0, "room": 0, "soll": 0, "login": 0}
+        self._runner: Optional[web.AppRunner] = None
+        self.port: Optional[int] = None
+
+    @property
+    def url(self) -> str:
+        """Return the base URL of the running server."""
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def room_count(self) -> int:
+        """Return the number of rooms of all houses."""
+        return sum(len(house.rooms) for house in self.houses.values())
+
+    def mutate(self, ratio: float) -> int:
+        """Change the temperature of a share of the rooms, return the number changed."""
+        changed = 0
+        for house in self.houses.values():
+            rooms = list(house.rooms.values())
+            for room in self._rng.sample(rooms, round(len(rooms) * ratio)):
+                room["temperatur"] = round(room["temperatur"] + self._rng.choice((-0.1, 0.1)), 2)
+                changed += 1
+        return changed
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        """Start serving, on a free port unless one is given."""
+        app = web.Application()
+        app.add_routes([
+            web.get("/get/json/v1/{haus}/temps/", self._handle_temps),
+            web.get("/get/json/v1/{haus}/temps/{raum}/", self._handle_room),
+            web.post("/set/json/v1/{haus}/soll/{raum}/", self._handle_soll),
+            web.get("/accounts/m_login/", self._handle_login),
+        ])
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _delay(self) -> None:
+        """Wait for the configured latency."""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _house(self, request: web.Request) -> SyntheticHouse:
+        """Return the house of a request."""
+        try:
+            return self.houses[int(request.match_info["haus"])]
+        except (KeyError, ValueError) as ex:
+            raise web.HTTPNotFound() from ex
+
+    def _room(self, request: web.Request) -> Dict[str, Any]:
+        """Return the room of a request."""
+        try:
+            return self._house(request).rooms[int(request.match_info["raum"])]
+        except (KeyError, ValueError) as ex:
+            raise web.HTTPNotFound() from ex
+
+    async def _handle_temps(self, request: web.Request) -> web.Response:
+        """Answer with all floors of a house."""
+        await self._delay()
+        self.requests["temps"] += 1
+        house = self._house(request)
+        return web.Response(text=json.dumps(house.floors), content_type="application/json")
+
+    async def _handle_room(self, request: web.Request) -> web.Response:
+        """Answer with a single room."""
+        await self._delay()
+        self.requests["room"] += 1
+        return web.Response(text=json.dumps(self._room(request)), content_type="application/json")
+
+    async def _handle_soll(self, request: web.Request) -> web.Response:
+        """Set the target temperature of a room."""
+        await self._delay()
+        self.requests["soll"] += 1
+        data = await request.post()
+        if data.get("user") != STUB_USER or data.get("password") != STUB_PASSWORD:
+            raise web.HTTPForbidden()
+        room = self._room(request)
+        try:
+            room["solltemperatur"] = float(data["soll"])
+        except (KeyError, ValueError) as ex:
+            raise web.HTTPBadRequest() from ex
+        return web.json_response({"success": True})
+
+    async def _handle_login(self, request: web.Request) -> web.Response:
+        """Answer with the login page of the controller."""
+        await self._delay()
+        self.requests["login"] += 1
+        return web.Response(text=LOGIN_PAGE, content_type="text/html")
+
+
+async def _async_serve(args: argparse.Namespace) -> None:
+    """Serve until interrupted."""
+    controller = StubController(
+        {house_id: args.rooms for house_id in range(1, args.houses + 1)},
+        return_sensors=args.return_sensors,
+        latency=args.latency,
+    )
+    await controller.start(args.host, args.port)
+    _LOGGER.info("Serving %d rooms at %s (user and password: %s)",
+                 controller.room_count, controller.url, STUB_USER)
+    try:
+        while True:
+            await asyncio.sleep(args.mutate_interval)
+            controller.mutate(args.change_ratio)
+    finally:
+        await controller.stop()
+
+
+def main() -> None:
+    """Run the stub controller from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--houses", type=int, default=1)
+    parser.add_argument("--rooms", type=int, default=20, help="rooms per house")
+    parser.add_argument("--return-sensors", type=int, default=1, help="return sensors per room")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each answer")
+    parser.add_argument("--change-ratio", type=float, default=0.1,
+                        help="share of rooms whose temperature changes per interval")
+    parser.add_argument("--mutate-interval", type=float, default=30.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_async_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,35 @@
 """The Controme integration."""
 import logging
+from aiohttp.hdrs import USER_AGENT
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from homeassistant.const import Platform
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE, Platform
+from homeassistant.helpers.aiohttp_client import SERVER_SOFTWARE
 from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.storage import Store
 from .coordinator import ContromeDataUpdateCoordinator
-from .const import DOMAIN, CONF_HAUS_ID, CONF_API_URL
+from .helpers import create_controme_session
+from .services import async_setup_services
+from .topology import build_topology, async_remove_expired
+from .const import (
+    DOMAIN,
+    CONF_HAUS_ID,
+    CONF_HAUS_IDS,
+    CONF_API_URL,
+    CONF_USER,
+    CONF_PASSWORD,
+    CONF_SCAN_INTERVAL,
+    CONF_FAST_SCAN_INTERVAL,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_STALE_GRACE_PERIOD,
+    DEFAULT_SCAN_INTERVAL,
+    DEFAULT_FAST_SCAN_INTERVAL,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_STALE_GRACE_PERIOD,
+    SNAPSHOT_STORAGE_VERSION,
+    SNAPSHOT_STORAGE_KEY,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -17,37 +40,113 @@ CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     """Set up the Controme component."""
     hass.data.setdefault(DOMAIN, {})
+    async_setup_services(hass)
     return True
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Controme from a config entry."""
     hass.data.setdefault(DOMAIN, {})
+    house_ids = get_house_ids(entry)
+    # Registered first, so the session is closed after everything else unloaded
+    session = create_controme_session(headers={USER_AGENT: SERVER_SOFTWARE})
+    entry.async_on_unload(session.close)
+
+    async def _async_close_session(_event: Event) -> None:
+        """Close the session on shutdown, config entries are not unloaded then."""
+        await session.close()
+
+    entry.async_on_unload(
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, _async_close_session)
+    )
+
     coordinator = ContromeDataUpdateCoordinator(
         hass,
         entry.data[CONF_API_URL],
-        entry.data[CONF_HAUS_ID],
+        house_ids,
+        entry.data[CONF_USER],
+        entry.data[CONF_PASSWORD],
+        scan_interval=entry.options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL),
+        fast_scan_interval=entry.options.get(CONF_FAST_SCAN_INTERVAL, DEFAULT_FAST_SCAN_INTERVAL),
+        max_scan_interval=entry.options.get(CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL),
+        snapshot_store=_snapshot_store(hass, entry),
+        session=session,
+        stale_grace_period=entry.options.get(CONF_STALE_GRACE_PERIOD, DEFAULT_STALE_GRACE_PERIOD),
     )
-    
-    await coordinator.async_config_entry_first_refresh()
-    
-    hass.data[DOMAIN][entry.entry_id] = {
+
+    if await coordinator.async_restore_snapshot():
+        # Start from the stored data, entities are marked stale until the
+        # first live refresh finishes in the background
+        entry.async_create_background_task(
+            hass, coordinator.async_refresh(), f"{DOMAIN} first refresh"
+        )
+    else:
+        await coordinator.async_config_entry_first_refresh()
+
+    entry_data = hass.data[DOMAIN][entry.entry_id] = {
         "coordinator": coordinator,
         "config": entry.data,
+        # Floors and rooms are walked once here for all platforms
+        "topology": build_topology(coordinator.data),
     }
 
-    # Register the main Controme hub device
+    @callback
+    def _async_rebuild_topology() -> None:
+        """Rebuild the topology before the platforms add or remove entities."""
+        entry_data["topology"] = build_topology(coordinator.data, coordinator.expired_elements)
+
+    entry.async_on_unload(coordinator.async_add_topology_listener(_async_rebuild_topology))
+
+    # Register a Controme hub device per house
     device_registry = dr.async_get(hass)
-    device_registry.async_get_or_create(
-        config_entry_id=entry.entry_id,
-        identifiers={(DOMAIN, entry.data[CONF_HAUS_ID])},
-        manufacturer="Controme",
-        name=f"Controme Home {entry.data[CONF_HAUS_ID]}",
-        model="Thermostat API",
-    )
+    for house_id in house_ids:
+        device_registry.async_get_or_create(
+            config_entry_id=entry.entry_id,
+            identifiers={(DOMAIN, house_id)},
+            manufacturer="Controme",
+            name=f"Controme Home {house_id}",
+            model="Thermostat API",
+        )
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
+    @callback
+    def _async_cleanup_registries() -> None:
+        """Delete rooms and values that are gone for good, after the platforms."""
+        async_remove_expired(hass, entry, entry_data["topology"])
+
+    entry.async_on_unload(coordinator.async_add_topology_listener(_async_cleanup_registries))
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
     return True
 
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the config entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
-    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
\ No newline at end of file
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if unload_ok:
+        # Services must not find rooms of unloaded entries
+        hass.data[DOMAIN].pop(entry.entry_id, None)
+    return unload_ok
+
+async def async_remove_config_entry_device(
+    hass: HomeAssistant, entry: ConfigEntry, device_entry: dr.DeviceEntry
+) -> bool:
+    """Allow deleting devices of rooms the controller no longer reports."""
+    entry_data = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if entry_data is None:
+        return False
+    return not device_entry.identifiers & entry_data["topology"].device_identifiers
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the stored data of a deleted config entry."""
+    await _snapshot_store(hass, entry).async_remove()
+
+def get_house_ids(entry: ConfigEntry) -> list[str]:
+    """Return the houses of an entry, older entries hold a single house."""
+    return [str(house_id) for house_id in entry.data.get(CONF_HAUS_IDS) or [entry.data[CONF_HAUS_ID]]]
+
+def _snapshot_store(hass: HomeAssistant, entry: ConfigEntry) -> Store:
+    """Return the store holding the last payload of an entry."""
+    return Store(hass, SNAPSHOT_STORAGE_VERSION, f"{SNAPSHOT_STORAGE_KEY}.{entry.entry_id}")
\ No newline at end of file
@@ -4,14 +4,54 @@ from typing import Any, Optional
 import voluptuous as vol
 import aiohttp
 import asyncio
+from contextlib import aclosing, suppress
+from ipaddress import ip_address
+import socket
+from urllib.parse import urlparse
 from homeassistant import config_entries
+from homeassistant.components import network
 from homeassistant.core import callback
-from homeassistant.data_entry_flow import FlowResult
-from .const import DOMAIN, CONF_API_URL, CONF_HAUS_ID, CONF_USER, CONF_PASSWORD
-from .helpers import scan_network
+from homeassistant.data_entry_flow import AbortFlow, FlowResult, UnknownFlow
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.device_registry import format_mac
+try:
+    from homeassistant.helpers.service_info.dhcp import DhcpServiceInfo
+    from homeassistant.helpers.service_info.zeroconf import ZeroconfServiceInfo
+except ImportError:
+    # Home Assistant before 2025.2
+    from homeassistant.components.dhcp import DhcpServiceInfo
+    from homeassistant.components.zeroconf import ZeroconfServiceInfo
+from .const import (
+    DOMAIN,
+    CONF_API_URL,
+    CONF_HAUS_IDS,
+    CONF_USER,
+    CONF_PASSWORD,
+    CONF_SCAN_INTERVAL,
+    CONF_FAST_SCAN_INTERVAL,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_STALE_GRACE_PERIOD,
+    DEFAULT_SCAN_INTERVAL,
+    DEFAULT_FAST_SCAN_INTERVAL,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_STALE_GRACE_PERIOD,
+)
+from .discovery import ContromeDiscoveryCache
+from .helpers import iter_network_scan, probe_controme_hosts, read_neighbor_table
 
 _LOGGER = logging.getLogger(__name__)
 
+# Time other controllers get to answer once the first one was found
+FIRST_HIT_GRACE = 2.0
+# The scan step is shown again with new counts every this many percent
+SCAN_REFRESH_PERCENT = 10
+# Houses are numbered from 1 without gaps; ids are probed in batches until
+# the first missing one, but not beyond MAX_HOUSE_ID
+HOUSE_PROBE_BATCH = 4
+MAX_HOUSE_ID = 32
+PROBE_TIMEOUT = aiohttp.ClientTimeout(total=10)
+
 # Schema for the initial choice step - using direct texts for options
 STEP_INIT_DATA_SCHEMA = vol.Schema({
     vol.Required("discovery_method"): vol.In({
@@ -27,22 +67,42 @@ STEP_USER_DATA_SCHEMA = vol.Schema({
     vol.Required(CONF_PASSWORD): str,
 })
 
+def _url_host(url: str) -> Optional[str]:
+    """Return the host of an API URL, which may lack the scheme."""
+    if "://" not in url:
+        url = f"http://{url}"
+    return urlparse(url).hostname
+
 class ContromeConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Controme."""
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> config_entries.OptionsFlow:
+        """Return the options flow for this handler."""
+        return ContromeOptionsFlow(config_entry)
+
     def __init__(self):
         """Initialize the config flow."""
         self._discovered_systems = []
         self._user_input = {}
-        self._scan_already_run = False
+        self.houses = []
+        self._scan_task: Optional[asyncio.Task] = None
+        self._scan_progress = 0
+        # Counts shown by the scan step
+        self._scan_status = {"found": "0", "probed": "0", "total": "0"}
 
     async def async_step_user(self, user_input: Optional[dict[str, Any]] = None) -> FlowResult:
         """Handle the initial step."""
         if user_input is None:
-            # Reset scan flag when starting a new flow
-            self._scan_already_run = False
+            if self._scan_task is not None:
+                # The scan was started from this step, which is shown again
+                # for new counts and once the scan is done
+                return await self.async_step_auto_discovery()
             # New initial step - ask for discovery method
             return self.async_show_form(
                 step_id="user",
@@ -66,21 +126,69 @@ class ContromeConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     async def async_step_auto_discovery(self, user_input: Optional[dict[str, Any]] = None) -> FlowResult:
         """Handle automatic discovery of Controme systems."""
-        # Check if we've already run a scan in this flow
-        if self._scan_already_run:
-            _LOGGER.warning("Scan already run, using cached results")
-            # Use cached results instead of running another scan
-            return self._show_form_after_scan()
-        
-        # Mark that we're running a scan
-        self._scan_already_run = True
-        
-        # Run the scan directly instead of using a progress task
-        await self._async_scan_systems()
-        
-        # Show the appropriate form based on scan results
+        # The scan runs in the background, the flow shows its progress meanwhile
+        if self._scan_task is None:
+            self._scan_task = self.hass.async_create_task(
+                self._async_scan_systems(), f"{DOMAIN} network scan"
+            )
+        if not self._scan_task.done():
+            return self.async_show_progress(
+                progress_action="scan",
+                description_placeholders=dict(self._scan_status),
+                progress_task=self._scan_task,
+            )
+        return self.async_show_progress_done(next_step_id="scan_result")
+
+    async def async_step_scan_result(self, user_input: Optional[dict[str, Any]] = None) -> FlowResult:
+        """Show the systems found by the scan."""
         return self._show_form_after_scan()
 
+    async def async_step_dhcp(self, discovery_info: DhcpServiceInfo) -> FlowResult:
+        """Handle a controller announced by a DHCP request."""
+        _LOGGER.debug("Controme candidate found via DHCP: %s", discovery_info)
+        return await self._async_step_discovered(discovery_info.ip, discovery_info.macaddress)
+
+    async def async_step_zeroconf(
+        self, discovery_info: ZeroconfServiceInfo
+    ) -> FlowResult:
+        """Handle a controller announced via mDNS."""
+        _LOGGER.debug("Controme candidate found via zeroconf: %s", discovery_info)
+        # The login probe and the scan only handle IPv4 addresses
+        host = next(
+            (str(address) for address in discovery_info.ip_addresses if address.version == 4),
+            None,
+        )
+        if host is None:
+            return self.async_abort(reason="not_ipv4_address")
+        return await self._async_step_discovered(host)
+
+    async def _async_step_discovered(self, host: str, mac: Optional[str] = None) -> FlowResult:
+        """Offer a passively discovered controller without scanning the network."""
+        # Entries set up by hand may have no unique id, they are matched by host
+        for entry in self._async_current_entries(include_ignore=False):
+            if _url_host(entry.data.get(CONF_API_URL, "")) == host:
+                return self.async_abort(reason="already_configured")
+
+        if mac is None:
+            neighbors = await self.hass.async_add_executor_job(read_neighbor_table)
+            mac = neighbors.get(host)
+        if mac:
+            # Follow the controller when DHCP hands out a new address
+            await self.async_set_unique_id(format_mac(mac))
+            self._abort_if_unique_id_configured(updates={CONF_API_URL: f"http://{host}"})
+
+        # The matchers are broad, only offer hosts serving the Controme login page
+        systems = await probe_controme_hosts(
+            [host], session=async_get_clientsession(self.hass)
+        )
+        if not systems:
+            return self.async_abort(reason="not_controme_device")
+        await ContromeDiscoveryCache(self.hass).async_record(systems)
+
+        self._discovered_systems = systems
+        self.context["title_placeholders"] = {"name": systems[0]["title"]}
+        return await self.async_step_credentials()
+
     def _show_form_after_scan(self) -> FlowResult:
         """Show the appropriate form based on scan results."""
         if self._discovered_systems:
@@ -124,18 +232,78 @@ class ContromeConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             data_schema=STEP_USER_DATA_SCHEMA
         )
 
+    @callback
+    def _async_scan_progress(self, probed: int, total: int) -> None:
+        """Report the share of probed hosts, in whole percent steps."""
+        self._scan_status.update(probed=str(probed), total=str(total))
+        progress = min(100, probed * 100 // total)
+        if progress <= self._scan_progress:
+            return
+        refresh = progress // SCAN_REFRESH_PERCENT > self._scan_progress // SCAN_REFRESH_PERCENT
+        self._scan_progress = progress
+        # The progress bar needs Home Assistant 2025.5
+        if hasattr(self, "async_update_progress"):
+            self.async_update_progress(progress / 100)
+        if refresh:
+            self._async_refresh_scan_step()
+
+    @callback
+    def _async_refresh_scan_step(self) -> None:
+        """Show the scan step again, the frontend reloads it for new counts."""
+        async def _async_refresh() -> None:
+            if self._scan_task is None or self._scan_task.done():
+                # The step moves on to the results by itself
+                return
+            with suppress(UnknownFlow):
+                await self.hass.config_entries.flow.async_configure(self.flow_id)
+
+        self.hass.async_create_task(_async_refresh(), f"{DOMAIN} scan progress")
+
     async def _async_scan_systems(self) -> None:
         """Perform the actual network scan."""
         try:
             _LOGGER.info("Starting network scan for Controme systems...")
             # Clear any previous results
             self._discovered_systems = []
-            # Run the scan
-            self._discovered_systems = await scan_network()
+            # Controllers found before usually still answer, try them first
+            cache = ContromeDiscoveryCache(self.hass)
+            self._discovered_systems = await cache.async_revalidate()
+            if self._discovered_systems:
+                _LOGGER.info("Found %d known Controme systems", len(self._discovered_systems))
+                return
+            # Scan the networks of the adapters enabled in the network
+            # settings, also ones without a default route
+            interfaces = [
+                f"{ip_info['address']}/{ip_info['network_prefix']}"
+                for adapter in await network.async_get_adapters(self.hass)
+                if adapter["enabled"]
+                for ip_info in adapter["ipv4"]
+            ]
+            loop = asyncio.get_running_loop()
+            try:
+                async with asyncio.timeout(None) as scan_timeout, aclosing(
+                    iter_network_scan(
+                        interfaces=interfaces or None,
+                        on_progress=self._async_scan_progress,
+                        session=async_get_clientsession(self.hass),
+                    )
+                ) as scan:
+                    async for system in scan:
+                        _LOGGER.info("Found Controme system at %s", system["url"])
+                        self._discovered_systems.append(system)
+                        self._scan_status["found"] = str(len(self._discovered_systems))
+                        self._async_refresh_scan_step()
+                        # Offer the first system right away, after a short
+                        # time for others that answer at about the same time
+                        if scan_timeout.when() is None:
+                            scan_timeout.reschedule(loop.time() + FIRST_HIT_GRACE)
+            except TimeoutError:
+                pass
+            await cache.async_record(self._discovered_systems)
             _LOGGER.info("Network scan complete. Found %d systems", len(self._discovered_systems))
         except Exception as err:
+            # Systems found before the error can still be offered
             _LOGGER.error("Error scanning network: %s", err)
-            self._discovered_systems = []
 
     async def async_step_credentials(self, user_input: Optional[dict[str, Any]] = None) -> FlowResult:
         """Handle credential entry for a discovered system."""
@@ -183,33 +351,38 @@ class ContromeConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         
         try:
             # Test connection with the provided data
-            async with aiohttp.ClientSession() as session:
-                base_url = user_input[CONF_API_URL]
-                if not base_url.startswith(("http://", "https://")):
-                    base_url = f"http://{base_url}"
-                url = f"{base_url.rstrip('/')}/get/json/v1/1/temps/"
-                
-                async with session.get(
-                    url,
-                    auth=aiohttp.BasicAuth(user_input[CONF_USER], user_input[CONF_PASSWORD])
-                ) as response:
-                    if response.status == 401:
-                        errors["base"] = "invalid_auth"
-                    elif response.status != 200:
-                        errors["base"] = "cannot_connect"
-                    else:
-                        # Save inputs for later steps
-                        self._user_input = user_input
-                        # Create config entry
-                        return self.async_create_entry(
-                            title=f"Controme ({user_input[CONF_API_URL]})",
-                            data={
-                                CONF_API_URL: base_url,
-                                CONF_USER: user_input[CONF_USER],
-                                CONF_PASSWORD: user_input[CONF_PASSWORD],
-                                CONF_HAUS_ID: "1"  # Default house ID
-                            }
-                        )
+            base_url = user_input[CONF_API_URL]
+            if not base_url.startswith(("http://", "https://")):
+                base_url = f"http://{base_url}"
+            auth = aiohttp.BasicAuth(user_input[CONF_USER], user_input[CONF_PASSWORD])
+            statuses = await self._async_probe_houses(base_url.rstrip('/'), auth)
+
+            if statuses.get("1") == 401:
+                errors["base"] = "invalid_auth"
+            elif self.houses:
+                await self._async_set_unique_id_from_host(base_url)
+                # Save inputs for later steps
+                self._user_input = {
+                    CONF_API_URL: base_url,
+                    CONF_USER: user_input[CONF_USER],
+                    CONF_PASSWORD: user_input[CONF_PASSWORD],
+                }
+                # Remember the controller for the next discovery run
+                if host := urlparse(base_url).hostname:
+                    await ContromeDiscoveryCache(self.hass).async_record(
+                        [{"url": host, "title": f"Controme at {host}"}]
+                    )
+                if len(self.houses) > 1:
+                    return await self.async_step_select_house()
+                # Create config entry
+                return self.async_create_entry(
+                    title=f"Controme ({user_input[CONF_API_URL]})",
+                    data={**self._user_input, CONF_HAUS_IDS: [self.houses[0]["id"]]},
+                )
+            else:
+                errors["base"] = "cannot_connect"
+        except AbortFlow:
+            raise
         except Exception as err:
             _LOGGER.error("Error testing connection: %s", err)
             errors["base"] = "cannot_connect"
@@ -257,6 +430,79 @@ class ContromeConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 errors=errors
             )
 
+    async def _async_set_unique_id_from_host(self, base_url: str) -> None:
+        """Identify the controller by its MAC, like a discovered one."""
+        if self.unique_id is not None:
+            return
+        host = _url_host(base_url)
+        if host is None:
+            return
+        try:
+            ip_address(host)
+        except ValueError:
+            # The neighbor table is keyed by address
+            try:
+                addresses = await self.hass.loop.getaddrinfo(host, None, family=socket.AF_INET)
+            except OSError:
+                return
+            if not addresses:
+                return
+            host = addresses[0][4][0]
+        # The probe just reached the controller, so a controller on the local
+        # network has a fresh entry
+        neighbors = await self.hass.async_add_executor_job(read_neighbor_table)
+        if mac := neighbors.get(host):
+            await self.async_set_unique_id(format_mac(mac))
+            self._abort_if_unique_id_configured(updates={CONF_API_URL: base_url})
+
+    async def _async_probe_houses(self, base_url: str, auth: aiohttp.BasicAuth) -> dict[str, int]:
+        """Find the houses of a controller, probing a batch of house ids at once.
+
+        Sets self.houses and returns the HTTP status per house id.
+        """
+        session = async_get_clientsession(self.hass)
+
+        async def _probe(house_id: str) -> tuple[int, int]:
+            url = f"{base_url}/get/json/v1/{house_id}/temps/"
+            async with session.get(url, auth=auth, timeout=PROBE_TIMEOUT) as response:
+                if response.status != 200:
+                    return response.status, 0
+                floors = await response.json(content_type=None)
+                if not isinstance(floors, list):
+                    return response.status, 0
+                return response.status, sum(len(floor.get("raeume", [])) or 1 for floor in floors)
+
+        statuses = {}
+        self.houses = []
+        for first_id in range(1, MAX_HOUSE_ID + 1, HOUSE_PROBE_BATCH):
+            house_ids = [
+                str(house_id)
+                for house_id in range(first_id, min(first_id + HOUSE_PROBE_BATCH, MAX_HOUSE_ID + 1))
+            ]
+            results = await asyncio.gather(*(_probe(house_id) for house_id in house_ids), return_exceptions=True)
+            if first_id == 1 and isinstance(results[0], Exception):
+                # The first house always exists, its error is the connection error
+                raise results[0]
+
+            for house_id, result in zip(house_ids, results):
+                if isinstance(result, Exception):
+                    _LOGGER.debug("House %s not available: %s", house_id, result)
+                    break
+                status, room_count = result
+                statuses[house_id] = status
+                if status != 200 or not room_count:
+                    break
+                self.houses.append({"id": house_id, "name": f"Haus {house_id} ({room_count} Räume)"})
+            else:
+                continue
+            # The first missing house ends the search
+            break
+        else:
+            _LOGGER.warning("Controller has houses up to id %d, further houses are not offered",
+                            MAX_HOUSE_ID)
+        _LOGGER.debug("Found houses: %s", self.houses)
+        return statuses
+
     async def async_step_select_system(self, user_input: Optional[dict[str, Any]] = None) -> FlowResult:
         """Handle system selection step."""
         if user_input is not None:
@@ -276,27 +522,71 @@ class ContromeConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     async def async_step_select_house(self, user_input: Optional[dict[str, Any]] = None) -> FlowResult:
         """Handle the house selection step when multiple houses are found."""
-        if user_input is None:
-            _LOGGER.debug("Entered async_step_select_house without user input. Available houses: %s", self.houses)
-            data_schema = vol.Schema({
-                vol.Required(CONF_HAUS_ID): vol.In({
-                    house["id"]: house.get("name", house["id"]) for house in self.houses
-                })
-            })
-            _LOGGER.debug("Showing select_house form with schema: %s", data_schema)
-            return self.async_show_form(
-                step_id="select_house", 
-                data_schema=data_schema
-            )
+        errors = {}
+        if user_input is not None:
+            if user_input[CONF_HAUS_IDS]:
+                _LOGGER.info("Houses selected: %s", user_input[CONF_HAUS_IDS])
+                self._user_input[CONF_HAUS_IDS] = user_input[CONF_HAUS_IDS]
+                _LOGGER.info("Creating config entry for Controme integration based on selected houses")
+                return self.async_create_entry(
+                    title=f"Controme ({self._user_input[CONF_API_URL]})",
+                    data=self._user_input,
+                )
+            errors["base"] = "no_house_selected"
 
-        _LOGGER.info("House selected: %s", user_input[CONF_HAUS_ID])
-        self._user_input[CONF_HAUS_ID] = user_input[CONF_HAUS_ID]
-        _LOGGER.debug("Final user input data for config entry: %s", self._user_input)
-        _LOGGER.info("Creating config entry for Controme integration based on selected house")
-        return self.async_create_entry(title="Controme", data=self._user_input)
-        
-    # Tell Home Assistant how to handle the progress screen
-    @staticmethod
-    def async_get_progress_steps() -> list[str]:
-        """Return a list of steps that are shown while we're in progress."""
-        return ["auto_discovery"]
\ No newline at end of file
+        _LOGGER.debug("Entered async_step_select_house. Available houses: %s", self.houses)
+        houses = {house["id"]: house.get("name", house["id"]) for house in self.houses}
+        data_schema = vol.Schema({
+            # All houses are polled together by one coordinator
+            vol.Required(CONF_HAUS_IDS, default=list(houses)): cv.multi_select(houses),
+        })
+        return self.async_show_form(
+            step_id="select_house",
+            data_schema=data_schema,
+            errors=errors,
+        )
+
+
+class ContromeOptionsFlow(config_entries.OptionsFlow):
+    """Handle the polling options of a Controme entry."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize the options flow."""
+        self._entry = config_entry
+
+    async def async_step_init(self, user_input: Optional[dict[str, Any]] = None) -> FlowResult:
+        """Manage the polling intervals and the stale data grace period."""
+        errors = {}
+        if user_input is not None:
+            if not (
+                user_input[CONF_FAST_SCAN_INTERVAL]
+                <= user_input[CONF_SCAN_INTERVAL]
+                <= user_input[CONF_MAX_SCAN_INTERVAL]
+            ):
+                errors["base"] = "invalid_intervals"
+            else:
+                return self.async_create_entry(title="", data=user_input)
+
+        options = self._entry.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema({
+                vol.Required(
+                    CONF_SCAN_INTERVAL,
+                    default=options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=10, max=3600)),
+                vol.Required(
+                    CONF_FAST_SCAN_INTERVAL,
+                    default=options.get(CONF_FAST_SCAN_INTERVAL, DEFAULT_FAST_SCAN_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=5, max=3600)),
+                vol.Required(
+                    CONF_MAX_SCAN_INTERVAL,
+                    default=options.get(CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=10, max=3600)),
+                vol.Required(
+                    CONF_STALE_GRACE_PERIOD,
+                    default=options.get(CONF_STALE_GRACE_PERIOD, DEFAULT_STALE_GRACE_PERIOD),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=86400)),
+            }),
+            errors=errors,
+        )
@@ -9,9 +9,32 @@ DOMAIN: Final = "controme"
 # Configuration keys used in the web configuration
 CONF_API_URL: Final = "api_url"
 CONF_HAUS_ID: Final = "haus_id"
+CONF_HAUS_IDS: Final = "haus_ids"
 CONF_USER: Final = "user"
 CONF_PASSWORD: Final = "password"
 
+# Options for the adaptive polling
+CONF_SCAN_INTERVAL: Final = "scan_interval"
+CONF_FAST_SCAN_INTERVAL: Final = "fast_scan_interval"
+CONF_MAX_SCAN_INTERVAL: Final = "max_scan_interval"
+
+DEFAULT_SCAN_INTERVAL: Final = 60
+DEFAULT_FAST_SCAN_INTERVAL: Final = 15
+DEFAULT_MAX_SCAN_INTERVAL: Final = 300
+
+# How long the last good data is shown while the controller is unreachable
+CONF_STALE_GRACE_PERIOD: Final = "stale_grace_period"
+DEFAULT_STALE_GRACE_PERIOD: Final = 600
+
+# Persisted /temps/ payload used for a warm start
+SNAPSHOT_STORAGE_VERSION: Final = 1
+SNAPSHOT_STORAGE_KEY: Final = f"{DOMAIN}.snapshot"
+ATTR_STALE: Final = "stale"
+
+# Controllers found by earlier discovery runs
+DISCOVERY_STORAGE_VERSION: Final = 1
+DISCOVERY_STORAGE_KEY: Final = f"{DOMAIN}.discovery"
+
 # Platforms are now defined in __init__.py
 
 # New constants
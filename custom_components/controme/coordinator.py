@@ -1,65 +1,873 @@
 """DataUpdateCoordinator for Controme integration."""
+import asyncio
 from datetime import timedelta
+from functools import partial
+import hashlib
 import logging
-from typing import Any, Dict
+import random
+import time
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Set, Tuple
 
-from aiohttp import ClientTimeout
-from homeassistant.core import HomeAssistant
+from aiohttp import ClientSession, ClientTimeout
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+from homeassistant.util.json import json_loads
 
-from .const import DOMAIN
+from .const import (
+    DOMAIN,
+    DEFAULT_SCAN_INTERVAL,
+    DEFAULT_FAST_SCAN_INTERVAL,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_STALE_GRACE_PERIOD,
+)
+from .models import (
+    FIELD_ATTRIBUTES,
+    ContromeFloor,
+    ContromeHouse,
+    ContromeRoom,
+    ContromeReturnSensor,
+    ContromeSystem,
+    RoomKey,
+    TopologyElement,
+)
+from .metrics import (
+    ContromeMetrics,
+    METRIC_DECODE,
+    METRIC_DISPATCH,
+    METRIC_FETCH,
+    METRIC_NORMALIZE,
+    METRIC_PAYLOAD_SIZE,
+    METRIC_STATE_WRITES,
+    METRIC_TTFB,
+    UpdateCycle,
+)
+from .request_queue import ContromeRequestScheduler, RequestPriority
 
 _LOGGER = logging.getLogger(__name__)
 REQUEST_TIMEOUT = ClientTimeout(total=10)
+# Window in which repeated target changes for a room are merged into one write
+WRITE_COALESCE_DELAY = 1.5
+# Delay and attempts for reading back a written target from the room endpoint
+CONFIRM_DELAY = 3
+CONFIRM_ATTEMPTS = 3
+# How long a pending target hides differing readbacks from the controller
+OPTIMISTIC_TIMEOUT = 120
+# Adaptive polling: how long to poll fast after a write or a rapid change
+FAST_POLL_WINDOW = 180
+# Room temperature change per poll (K) that counts as heating up or cooling down
+RAPID_CHANGE_DELTA = 0.3
+# Fetches slower than this (s) make the coordinator back off
+SLOW_RESPONSE_TIME = 5
+# Writes sent at the same time by a bulk target change
+BULK_WRITE_CONCURRENCY = 4
+# Factor by which the interval grows while the house is stable
+BACKOFF_FACTOR = 1.5
+# Delay for persisting the latest payload, the controller data changes often
+SNAPSHOT_SAVE_DELAY = 300
+# Parsed polls a room or value must be missing in before its entities and
+# device are deleted from the registries; until then they are only removed
+TOPOLOGY_REMOVAL_POLLS = 3
+# Circuit breaker: failed polls until the controller counts as down, the
+# longest delay between retries (s) and the random spread of the delays
+BREAKER_THRESHOLD = 3
+BREAKER_MAX_DELAY = 900
+BACKOFF_JITTER = 0.2
 
-class ContromeDataUpdateCoordinator(DataUpdateCoordinator[Dict[str, Any]]):
+# (house_id, floor_id, room_id, field) where field is an API key or "return_<sensor name>"
+ChangeKey = Tuple[Any, Any, Any, str]
+# (house_id, room_id), the write API addresses rooms within a house
+TargetKey = Tuple[Any, Any]
+
+# Room values that entities display and that are compared between polls
+TRACKED_FIELDS: Tuple[Tuple[str, str], ...] = tuple(FIELD_ATTRIBUTES.items())
+
+
+def room_context(room_key: RoomKey, *fields: str) -> FrozenSet[ChangeKey]:
+    """Return the listener context for entities showing the given room fields."""
+    return frozenset((*room_key, field) for field in fields)
+
+
+def same_temperature(value: Optional[float], target: float) -> bool:
+    """Return True if a temperature read from the API equals the target."""
+    return value is not None and abs(value - target) < 0.01
+
+class ContromeDataUpdateCoordinator(DataUpdateCoordinator[ContromeSystem]):
     """Class to manage fetching Controme data."""
 
     def __init__(
         self,
         hass: HomeAssistant,
         base_url: str,
-        house_id: str,
+        house_ids: List[str],
+        user: str,
+        password: str,
+        scan_interval: int = DEFAULT_SCAN_INTERVAL,
+        fast_scan_interval: int = DEFAULT_FAST_SCAN_INTERVAL,
+        max_scan_interval: int = DEFAULT_MAX_SCAN_INTERVAL,
+        snapshot_store: Optional[Store] = None,
+        session: Optional[ClientSession] = None,
+        stale_grace_period: int = DEFAULT_STALE_GRACE_PERIOD,
     ) -> None:
         """Initialize the coordinator."""
         super().__init__(
             hass,
             _LOGGER,
             name=DOMAIN,
-            update_interval=timedelta(seconds=60),
+            update_interval=timedelta(seconds=scan_interval),
         )
-        self._base_url = base_url
-        self._house_id = house_id
+        self._base_url = base_url.rstrip('/')
+        self._house_ids = list(house_ids)
+        self._user = user
+        self._password = password
+        # Pool of the entry, kept-alive connections serve polls and writes
+        self._session = session or async_get_clientsession(hass)
+        # All requests to the controller take turns here, writes first
+        self.scheduler = ContromeRequestScheduler()
+        # Rolling statistics of the hot path, shown by the diagnostic sensors
+        self.metrics = ContromeMetrics()
+        self._metrics_listeners: List[Callable[[], None]] = []
+        # Finished poll whose dispatch is still to be traced
+        self._undispatched_cycle: Optional[UpdateCycle] = None
+        # Bounds of the adaptive polling, fast <= normal <= max
+        self._scan_interval = scan_interval
+        self._fast_scan_interval = min(fast_scan_interval, scan_interval)
+        self._max_scan_interval = max(max_scan_interval, scan_interval)
+        self._fast_until = 0.0
+        self._max_temperature_delta = 0.0
+        # Latest requested target per room, waiting to be written
+        self._queued_targets: Dict[TargetKey, float] = {}
+        self._write_timers: Dict[TargetKey, CALLBACK_TYPE] = {}
+        self._writes_in_flight: Set[TargetKey] = set()
+        # Time of the first set_temperature call of a burst, for the write trace
+        self._queued_since: Dict[TargetKey, float] = {}
+        # Optimistic targets per room: (target, expiry in loop time)
+        self._pending_targets: Dict[TargetKey, Tuple[float, float]] = {}
+        self._confirm_timers: Dict[TargetKey, CALLBACK_TYPE] = {}
+        self._snapshot_store = snapshot_store
+        # True while the data comes from the persisted snapshot or the last
+        # good data is served because the controller is unreachable
+        self.stale = False
+        # Circuit breaker: consecutive failed polls and the time of the last
+        # good data, which is served for the grace period after it
+        self._failures = 0
+        self._stale_grace_period = stale_grace_period
+        self._last_good_time = 0.0
+        # Rooms with their value keys and return sensors, to detect added or
+        # removed entities between polls
+        self._topology_signature: Optional[FrozenSet[TopologyElement]] = None
+        self._topology_changed = False
+        # Elements missing from the latest polls, by the number of polls,
+        # skipped polls of an unchanged payload included
+        self._missing_polls: Dict[TopologyElement, int] = {}
+        # Elements missing for TOPOLOGY_REMOVAL_POLLS, set with a topology change
+        self.expired_elements: FrozenSet[TopologyElement] = frozenset()
+        self._topology_listeners: List[Callable[[], None]] = []
+        # Keys changed by the last fetch; None means notify every listener
+        self._changed_keys: Optional[Set[ChangeKey]] = None
+        self._last_notified_success = True
+        # Per house: last processed payload, its fingerprint and cache validators
+        self._payloads: Dict[str, list] = {}
+        self._payload_digests: Dict[str, bytes] = {}
+        self._etags: Dict[str, str] = {}
+        self._last_modified: Dict[str, str] = {}
+        self.poll_count = 0
+        self.skipped_polls = 0
 
-    async def _async_update_data(self) -> Dict[str, Any]:
-        """Fetch data from Controme API."""
-        session = async_get_clientsession(self.hass)
-        endpoint = f"{self._base_url}/get/json/v1/{self._house_id}/temps/"
+    @property
+    def house_ids(self) -> List[str]:
+        """Return the ids of the polled houses."""
+        return self._house_ids
+
+    def get_room(self, room_key: RoomKey) -> Optional[ContromeRoom]:
+        """Return the room for the given (house_id, floor_id, room_id)."""
+        if self.data is None:
+            return None
+        return self.data.rooms.get(room_key)
+
+    def get_return_sensor(
+        self, room_key: RoomKey, name: str
+    ) -> Optional[ContromeReturnSensor]:
+        """Return the return sensor of a room by its name."""
+        room = self.get_room(room_key)
+        if room is None:
+            return None
+        return room.return_sensors.get(name)
 
+    def _rooms_with_id(self, target_key: TargetKey) -> list:
+        """Return the rooms with the given id, the write API only knows room ids."""
+        if self.data is None:
+            return []
+        house = self.data.houses.get(target_key[0])
+        if house is None:
+            return []
+        return [room for room in house.rooms.values() if room.id == target_key[1]]
+
+    async def async_restore_snapshot(self) -> bool:
+        """Load the last persisted payload as stale data, return True on success."""
+        if self._snapshot_store is None:
+            return False
         try:
-            start_time = self.hass.loop.time()
-            async with session.get(endpoint, timeout=REQUEST_TIMEOUT) as response:
+            snapshot = await self._snapshot_store.async_load()
+        except Exception as ex:
+            _LOGGER.warning("Error loading the stored Controme data: %s", ex)
+            return False
+        if not snapshot:
+            return False
+        payloads = snapshot.get("payloads")
+        if payloads is None and "payload" in snapshot:
+            # Stored before several houses were supported
+            payloads = {snapshot.get("house_id"): snapshot["payload"]}
+        if (
+            not isinstance(payloads, dict)
+            or set(payloads) != set(self._house_ids)
+            or not all(isinstance(payload, list) for payload in payloads.values())
+        ):
+            return False
+
+        self._payloads = dict(payloads)
+        self.data = self._process_houses({
+            house_id: ContromeHouse.from_payload(payloads[house_id], house_id)
+            for house_id in self._house_ids
+        })
+        self._changed_keys = None
+        self.stale = True
+        self._last_good_time = self.hass.loop.time()
+        _LOGGER.debug("Restored %d rooms from the stored data", len(self.data.rooms))
+        return True
+
+    @callback
+    def _async_save_snapshot(self) -> None:
+        """Persist the payloads for the next warm start."""
+        if self._snapshot_store is None:
+            return
+        self._snapshot_store.async_delay_save(
+            lambda: {"house_ids": self._house_ids, "payloads": dict(self._payloads)},
+            SNAPSHOT_SAVE_DELAY,
+        )
+
+    def _process_houses(self, houses: Dict[str, ContromeHouse]) -> ContromeSystem:
+        """Combine the normalized houses and work out what changed."""
+        system = ContromeSystem.from_houses(houses)
+        self._update_topology(system.topology_elements())
+        if self._pending_targets:
+            for room in system.rooms.values():
+                if (room.house_id, room.id) in self._pending_targets:
+                    self._apply_pending_target(room)
+        self._changed_keys = self._collect_changes(system)
+        return system
+
+    def _update_topology(self, signature: FrozenSet[TopologyElement]) -> None:
+        """Detect added and removed rooms or values, deleting them only once gone for good."""
+        previous = self._topology_signature
+        if previous is None:
+            self._topology_signature = signature
+            return
+        if self.stale:
+            # A controller coming back from an outage may still be starting up,
+            # its rooms are compared on the next poll
+            return
+
+        for element in previous - signature:
+            self._missing_polls.setdefault(element, 0)
+        expired = set()
+        for element in list(self._missing_polls):
+            if element in signature:
+                del self._missing_polls[element]
+                continue
+            self._missing_polls[element] += 1
+            if self._missing_polls[element] >= TOPOLOGY_REMOVAL_POLLS:
+                del self._missing_polls[element]
+                expired.add(element)
+
+        self.expired_elements = frozenset(expired)
+        if signature != previous or expired:
+            _LOGGER.info("Rooms or sensors of the Controme system changed")
+            self._topology_changed = True
+        self._topology_signature = signature
+
+    def _collect_changes(self, system: ContromeSystem) -> Set[ChangeKey]:
+        """Compare the new rooms against the previous ones, field by field."""
+        changed: Set[ChangeKey] = set()
+        previous_rooms = self.data.rooms if self.data is not None else {}
+        max_delta = 0.0
+        for key, room in system.rooms.items():
+            previous = previous_rooms.get(key)
+            if previous is None:
+                changed.update((*key, api_key) for api_key, _ in TRACKED_FIELDS)
+                changed.update((*key, f"return_{name}") for name in room.return_sensors)
+                continue
+
+            for api_key, attribute in TRACKED_FIELDS:
+                if getattr(previous, attribute) != getattr(room, attribute):
+                    changed.add((*key, api_key))
+            for name, sensor in room.return_sensors.items():
+                previous_sensor = previous.return_sensors.get(name)
+                if previous_sensor is None or previous_sensor.value != sensor.value:
+                    changed.add((*key, f"return_{name}"))
+            if room.temperature is not None and previous.temperature is not None:
+                max_delta = max(max_delta, abs(room.temperature - previous.temperature))
+        self._max_temperature_delta = max_delta
+        return changed
+
+    def _apply_pending_target(self, room: ContromeRoom) -> None:
+        """Hide a stale target readback while a written target is pending."""
+        target_key = (room.house_id, room.id)
+        target, expires = self._pending_targets[target_key]
+        if same_temperature(room.target_temperature, target):
+            _LOGGER.debug("Target %s for room %s confirmed", target, room.id)
+            self._async_clear_pending(target_key, confirmed=True)
+        elif self.hass.loop.time() >= expires:
+            _LOGGER.debug("Target %s for room %s not confirmed in time, using %s",
+                        target, room.id, room.target_temperature)
+            self._async_clear_pending(target_key)
+        else:
+            room.target_temperature = target
+
+    @callback
+    def _async_clear_pending(self, target_key: TargetKey, confirmed: bool = False) -> None:
+        """Forget the optimistic target of a room."""
+        self._pending_targets.pop(target_key, None)
+        if cancel := self._confirm_timers.pop(target_key, None):
+            cancel()
+        if not confirmed:
+            # The rooms still show the optimistic target, the next poll must
+            # parse the payload of the house even if it did not change
+            house_id = target_key[0]
+            self._payload_digests.pop(house_id, None)
+            self._etags.pop(house_id, None)
+            self._last_modified.pop(house_id, None)
+
+    @callback
+    def _async_dispatch(self, changed: Set[ChangeKey]) -> None:
+        """Notify listeners about values changed outside of a poll."""
+        if changed:
+            self._changed_keys = changed
+            self.async_update_listeners()
+
+    @callback
+    def _async_set_room_target(self, target_key: TargetKey, target: float) -> None:
+        """Show a target on all entities of a room right away."""
+        changed: Set[ChangeKey] = set()
+        for room in self._rooms_with_id(target_key):
+            if room.target_temperature != target:
+                room.target_temperature = target
+                changed.add((*room.key, "solltemperatur"))
+        self._async_dispatch(changed)
+
+    @callback
+    def async_add_topology_listener(self, update_callback: Callable[[], None]) -> CALLBACK_TYPE:
+        """Listen for rooms or sensors being added or removed."""
+        self._topology_listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            self._topology_listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def async_add_metrics_listener(self, update_callback: Callable[[], None]) -> CALLBACK_TYPE:
+        """Listen for new samples of the metrics, after each dispatch."""
+        self._metrics_listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            self._metrics_listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Notify only the listeners whose room fields changed."""
+        if self._topology_changed:
+            # Entities are added or removed before the others are updated
+            self._topology_changed = False
+            for update_callback in list(self._topology_listeners):
+                update_callback()
+
+        start_time = time.perf_counter()
+        changed = self._changed_keys
+        self._changed_keys = None
+        # Availability changes concern every entity
+        if changed is None or self.last_update_success != self._last_notified_success:
+            self._last_notified_success = self.last_update_success
+            # Each listener is an entity writing its state
+            state_writes = len(self._listeners)
+            super().async_update_listeners()
+        else:
+            _LOGGER.debug("Dispatching %d changed values", len(changed))
+            state_writes = 0
+            for update_callback, context in list(self._listeners.values()):
+                if context is None or not changed.isdisjoint(context):
+                    update_callback()
+                    state_writes += 1
+
+        dispatch_time = (time.perf_counter() - start_time) * 1000
+        self.metrics.record(METRIC_DISPATCH, dispatch_time)
+        self.metrics.record(METRIC_STATE_WRITES, state_writes)
+        if (cycle := self._undispatched_cycle) is not None:
+            self._undispatched_cycle = None
+            cycle.phases["dispatch"] = dispatch_time
+            cycle.state_writes = state_writes
+        for update_callback in list(self._metrics_listeners):
+            update_callback()
+
+    @callback
+    def _async_poll_fast(self) -> None:
+        """Switch to the fast polling interval for a while."""
+        if self.breaker_open:
+            # Keep backing off, the next poll probes the controller anyway
+            return
+        self._fast_until = self.hass.loop.time() + FAST_POLL_WINDOW
+        if self.update_interval != timedelta(seconds=self._fast_scan_interval):
+            self.update_interval = timedelta(seconds=self._fast_scan_interval)
+            if self._listeners:
+                self._schedule_refresh()
+
+    @property
+    def failures(self) -> int:
+        """Return the number of consecutive failed polls."""
+        return self._failures
+
+    @property
+    def skip_ratio(self) -> float:
+        """Return the share of polls whose payload was unchanged."""
+        return self.skipped_polls / self.poll_count if self.poll_count else 0.0
+
+    @property
+    def _can_skip_payload(self) -> bool:
+        """Return True if an unchanged payload needs no processing."""
+        # Pending targets expire and stale flags clear only while processing
+        return self.data is not None and not self._pending_targets and not self.stale
+
+    @property
+    def breaker_open(self) -> bool:
+        """Return True while the controller counts as down."""
+        return self._failures >= BREAKER_THRESHOLD
+
+    def _close_breaker(self) -> None:
+        """Return to normal polling after a successful fetch."""
+        if self.breaker_open:
+            _LOGGER.info("Controme controller reachable again after %d failed polls", self._failures)
+        if self._failures:
+            self._failures = 0
+            self.update_interval = timedelta(seconds=self._scan_interval)
+        self._last_good_time = self.hass.loop.time()
+
+    def _handle_failure(self, ex: Exception) -> ContromeSystem:
+        """Back off after a failed poll and serve the last good data for a while."""
+        self._failures += 1
+        # Exponential backoff with jitter from the normal interval, the next
+        # poll is the probe that closes the breaker again
+        delay = min(self._scan_interval * 2 ** (self._failures - 1), BREAKER_MAX_DELAY)
+        delay *= random.uniform(1 - BACKOFF_JITTER, 1 + BACKOFF_JITTER)
+        self.update_interval = timedelta(seconds=delay)
+        if self._failures == BREAKER_THRESHOLD:
+            _LOGGER.warning("Controme controller not reachable (%s), retrying with backoff", ex)
+        else:
+            _LOGGER.debug("Error communicating with API (failure %d, next try in %.0f seconds): %s",
+                        self._failures, delay, ex)
+
+        if (
+            self.data is not None
+            and self.hass.loop.time() - self._last_good_time < self._stale_grace_period
+        ):
+            if self.stale:
+                self._changed_keys = set()
+            else:
+                # Entities keep their values and get the stale flag
+                self.stale = True
+                self._changed_keys = None
+            return self.data
+        raise UpdateFailed(f"Error communicating with API: {str(ex)}") from ex
+
+    def _adapt_update_interval(self, fetch_time: float) -> None:
+        """Pick the next polling interval from the latest fetch."""
+        now = self.hass.loop.time()
+        current = self.update_interval.total_seconds()
+        if self._max_temperature_delta >= RAPID_CHANGE_DELTA:
+            # Heating up or cooling down, keep the values close to reality
+            self._fast_until = now + FAST_POLL_WINDOW
+        if now < self._fast_until and fetch_time < SLOW_RESPONSE_TIME:
+            interval = self._fast_scan_interval
+        elif fetch_time >= SLOW_RESPONSE_TIME or not self._changed_keys:
+            # Slow controller or stable house, back off towards the maximum
+            interval = min(max(current, self._scan_interval) * BACKOFF_FACTOR, self._max_scan_interval)
+        else:
+            interval = self._scan_interval
+
+        if interval != current:
+            _LOGGER.debug("Polling interval changed from %.0f to %.0f seconds", current, interval)
+            self.update_interval = timedelta(seconds=interval)
+
+    @callback
+    def async_queue_target(self, house_id: str, room_id: Any, temperature: float) -> None:
+        """Queue a target temperature; bursts for a room result in one write."""
+        target_key = (house_id, room_id)
+        self._queued_targets[target_key] = temperature
+        self._queued_since.setdefault(target_key, self.hass.loop.time())
+        self._pending_targets[target_key] = (
+            temperature,
+            self.hass.loop.time() + OPTIMISTIC_TIMEOUT,
+        )
+        self._async_set_room_target(target_key, temperature)
+        self._async_poll_fast()
+        if target_key not in self._write_timers and target_key not in self._writes_in_flight:
+            self._schedule_flush(target_key)
+
+    async def async_set_targets(self, targets: Dict[TargetKey, float]) -> Dict[TargetKey, bool]:
+        """Write the targets of many rooms at once and refresh once afterwards.
+
+        Returns whether the controller accepted the target, per room.
+        """
+        start_time = self.hass.loop.time()
+        expires = start_time + OPTIMISTIC_TIMEOUT
+        changed: Set[ChangeKey] = set()
+        for target_key, temperature in targets.items():
+            # The bulk write replaces targets still waiting in the coalescing window
+            self._queued_targets.pop(target_key, None)
+            self._queued_since.pop(target_key, None)
+            if cancel := self._write_timers.pop(target_key, None):
+                cancel()
+            self._pending_targets[target_key] = (temperature, expires)
+            for room in self._rooms_with_id(target_key):
+                if room.target_temperature != temperature:
+                    room.target_temperature = temperature
+                    changed.add((*room.key, "solltemperatur"))
+        # All rooms show their new target with a single dispatch
+        self._async_dispatch(changed)
+        self._async_poll_fast()
+
+        semaphore = asyncio.Semaphore(BULK_WRITE_CONCURRENCY)
+
+        async def _write(target_key: TargetKey, temperature: float) -> bool:
+            async with semaphore:
+                return await self._async_post_target(*target_key, temperature, start_time)
+
+        results = dict(zip(
+            targets,
+            await asyncio.gather(*(_write(key, temp) for key, temp in targets.items())),
+        ))
+        for target_key, success in results.items():
+            if not success:
+                self._async_clear_pending(target_key)
+        _LOGGER.debug("Bulk write of %d targets, %d failed",
+                    len(results), sum(not success for success in results.values()))
+
+        # One refresh confirms the written targets of all rooms
+        await self.async_refresh()
+        return results
+
+    @callback
+    def _schedule_flush(self, target_key: TargetKey) -> None:
+        """Write the queued target of a room once the coalescing window ends."""
+        self._write_timers[target_key] = async_call_later(
+            self.hass,
+            WRITE_COALESCE_DELAY,
+            partial(self._async_flush_target, target_key),
+        )
+
+    async def _async_flush_target(self, target_key: TargetKey, _now: Any = None) -> None:
+        """Send the latest queued target of a room to the controller."""
+        self._write_timers.pop(target_key, None)
+        temperature = self._queued_targets.pop(target_key, None)
+        queued_at = self._queued_since.pop(target_key, None)
+        if temperature is None:
+            return
+
+        self._writes_in_flight.add(target_key)
+        try:
+            success = await self._async_post_target(*target_key, temperature, queued_at)
+        finally:
+            self._writes_in_flight.discard(target_key)
+
+        if target_key in self._queued_targets:
+            # A newer target arrived while writing, the refresh follows that write
+            self._schedule_flush(target_key)
+        elif success:
+            self._schedule_confirm(target_key, CONFIRM_ATTEMPTS)
+        else:
+            # Drop the optimistic value and show what the controller has
+            self._async_clear_pending(target_key)
+            await self.async_request_refresh()
+
+    @callback
+    def _schedule_confirm(self, target_key: TargetKey, attempts: int) -> None:
+        """Read back the target of a room after a short delay."""
+        if cancel := self._confirm_timers.pop(target_key, None):
+            cancel()
+        self._confirm_timers[target_key] = async_call_later(
+            self.hass,
+            CONFIRM_DELAY,
+            partial(self._async_confirm_target, target_key, attempts),
+        )
+
+    async def _async_confirm_target(
+        self, target_key: TargetKey, attempts: int, _now: Any = None
+    ) -> None:
+        """Check a written target against the room endpoint of the controller."""
+        self._confirm_timers.pop(target_key, None)
+        if target_key not in self._pending_targets or target_key in self._queued_targets:
+            return
+
+        room_data = await self._async_fetch_room(*target_key)
+        pending = self._pending_targets.get(target_key)
+        if room_data is None or pending is None:
+            return
+
+        if same_temperature(room_data.target_temperature, pending[0]):
+            self._async_clear_pending(target_key, confirmed=True)
+            # Take over the fresh room values, they were read anyway
+            changed: Set[ChangeKey] = set()
+            for room in self._rooms_with_id(target_key):
+                for api_key, attribute in TRACKED_FIELDS:
+                    value = getattr(room_data, attribute)
+                    if room_data.has(api_key) and getattr(room, attribute) != value:
+                        setattr(room, attribute, value)
+                        changed.add((*room.key, api_key))
+            self._async_dispatch(changed)
+        elif attempts > 1:
+            self._schedule_confirm(target_key, attempts - 1)
+        # Otherwise regular polls confirm or expire the pending target
+
+    async def _async_fetch_room(self, house_id: str, room_id: Any) -> Optional[ContromeRoom]:
+        """Fetch the values of a single room."""
+        session = self._session
+        endpoint = f"{self._base_url}/get/json/v1/{house_id}/temps/{room_id}/"
+        try:
+            async with (
+                self.scheduler.slot(RequestPriority.POLL),
+                session.get(endpoint, timeout=REQUEST_TIMEOUT) as response,
+            ):
                 if response.status != 200:
-                    raise UpdateFailed(f"Error fetching data: {response.status}")
+                    _LOGGER.debug("Error reading room %s: %s", room_id, response.status)
+                    return None
                 data = await response.json()
-                
+        except Exception as ex:
+            _LOGGER.debug("Error reading room %s: %s", room_id, ex)
+            return None
+
+        # The room endpoint answers with the room itself or a floor list
+        if isinstance(data, dict):
+            data = [data]
+        if not isinstance(data, list):
+            return None
+        for entry in data:
+            if "raeume" in entry:
+                rooms = ContromeFloor.from_payload(entry, house_id).rooms
+            else:
+                rooms = [ContromeRoom.from_payload(entry, None, house_id)]
+            for room in rooms:
+                if str(room.id) == str(room_id):
+                    return room
+        return None
+
+    async def _async_post_target(
+        self, house_id: str, room_id: Any, temperature: float, queued_at: Optional[float] = None
+    ) -> bool:
+        """Post a target temperature for a room, return True on success."""
+        session = self._session
+        endpoint = f"{self._base_url}/set/json/v1/{house_id}/soll/{room_id}/"
+        data = {
+            "user": self._user,
+            "password": self._password,
+            "soll": str(float(temperature))
+        }
+        write = self.metrics.start_write(dt_util.utcnow(), house_id, room_id)
+        start_time = self.hass.loop.time()
+
+        try:
+            # Log request details for debugging
+            _LOGGER.debug("Setting temperature: URL=%s, Data=%s", endpoint, {**data, 'password': '***'})
+
+            async with self.scheduler.slot(RequestPriority.WRITE):
+                request_start = self.hass.loop.time()
+                write.wait = (request_start - start_time) * 1000
+                async with session.post(
+                    endpoint,
+                    data=data,
+                    headers={
+                        'Content-Type': 'application/x-www-form-urlencoded',
+                        'Accept': 'application/json'
+                    },
+                    timeout=REQUEST_TIMEOUT,
+                ) as response:
+                    response_text = await response.text()
+                    write.status = response.status
+                    write.request = (self.hass.loop.time() - request_start) * 1000
+                    if response.status == 200:
+                        _LOGGER.debug("Successfully set temperature: %s", response_text)
+                        return True
+                    if response.status == 403:
+                        _LOGGER.error("Authentication failed when setting temperature. Check your credentials.")
+                        _LOGGER.debug("Auth failed: URL=%s, User=%s, Response=%s",
+                                    endpoint, self._user, response_text)
+                    else:
+                        _LOGGER.error("Error setting temperature: status=%s, response=%s",
+                                    response.status, response_text)
+        except Exception as ex:
+            write.status = type(ex).__name__
+            _LOGGER.exception("Exception during setting temperature: %s", ex)
+        finally:
+            # Includes the coalescing window of set_temperature bursts
+            write.total = (self.hass.loop.time() - (queued_at or start_time)) * 1000
+        return False
+
+    async def async_shutdown(self) -> None:
+        """Cancel pending writes, confirmations and scheduled refreshes."""
+        for cancel in (*self._write_timers.values(), *self._confirm_timers.values()):
+            cancel()
+        self._write_timers.clear()
+        self._confirm_timers.clear()
+        self._queued_targets.clear()
+        self._queued_since.clear()
+        self.scheduler.shutdown()
+        await super().async_shutdown()
+
+    async def _async_fetch_payload(
+        self, house_id: str, conditional: bool, cycle: UpdateCycle
+    ) -> Optional[bytes]:
+        """Fetch the raw /temps/ payload of a house, None if it is not modified."""
+        endpoint = f"{self._base_url}/get/json/v1/{house_id}/temps/"
+
+        # Ask for the payload only if it changed, unless it is needed anyway
+        headers = {}
+        if conditional:
+            if etag := self._etags.get(house_id):
+                headers["If-None-Match"] = etag
+            if last_modified := self._last_modified.get(house_id):
+                headers["If-Modified-Since"] = last_modified
+
+        # Polls in the fast window come before routine ones
+        if self.hass.loop.time() < self._fast_until:
+            priority = RequestPriority.POLL
+        else:
+            priority = RequestPriority.BACKGROUND
+
+        async with self.scheduler.slot(priority):
+            start_time = time.perf_counter()
+            async with self._session.get(endpoint, timeout=REQUEST_TIMEOUT, headers=headers) as response:
+                # The status and headers are in, the body follows
+                ttfb = (time.perf_counter() - start_time) * 1000
+                self.metrics.record(METRIC_TTFB, ttfb)
+                cycle.houses[house_id] = {"status": response.status, "ttfb": ttfb}
+                if response.status == 304:
+                    return None
+                if response.status != 200:
+                    raise UpdateFailed(f"Error fetching data for house {house_id}: {response.status}")
+                body = await response.read()
+                for validators, header in ((self._etags, "ETag"), (self._last_modified, "Last-Modified")):
+                    if value := response.headers.get(header):
+                        validators[house_id] = value
+                    else:
+                        validators.pop(house_id, None)
+                return body
+
+    async def _async_update_data(self) -> ContromeSystem:
+        """Fetch data from Controme API."""
+        cycle = self.metrics.start_cycle(dt_util.utcnow())
+        self._undispatched_cycle = None
+        try:
+            start_time = self.hass.loop.time()
+            # All houses are fetched at the same time
+            bodies = await asyncio.gather(*(
+                self._async_fetch_payload(house_id, self._can_skip_payload, cycle)
+                for house_id in self._house_ids
+            ))
             fetch_time = self.hass.loop.time() - start_time
             _LOGGER.debug("Finished fetching controme data in %.3f seconds (success: True)", fetch_time)
-            
-            # Log a sample of the data for debugging
-            if data and isinstance(data, list) and len(data) > 0:
-                _LOGGER.debug("Received data for %d floors", len(data))
-                # Sample the first floor for debugging
-                first_floor = data[0]
-                if "raeume" in first_floor and first_floor["raeume"]:
-                    sample_room = first_floor["raeume"][0]
-                    # Log without sensitive values
-                    safe_sample = {k: v for k, v in sample_room.items() 
-                                if k not in ["password", "token"]}
-                    _LOGGER.debug("Sample room data: %s", safe_sample)
-            
-            return data
+            self.metrics.record(METRIC_FETCH, fetch_time * 1000)
+            cycle.phases["fetch"] = fetch_time * 1000
+            self.metrics.record(
+                METRIC_PAYLOAD_SIZE, sum(len(body) for body in bodies if body is not None)
+            )
+            decode_time = normalize_time = 0.0
+
+            self.poll_count += 1
+            houses: Dict[str, ContromeHouse] = {}
+            digests: Dict[str, bytes] = {}
+            for house_id, body in zip(self._house_ids, bodies):
+                # None is a 304 Not Modified answer
+                digest = hashlib.blake2b(body, digest_size=16).digest() if body is not None else None
+                if digest is not None:
+                    cycle.houses[house_id].update(size=len(body), hash=digest.hex())
+                if body is None or (
+                    self._can_skip_payload and digest == self._payload_digests.get(house_id)
+                ):
+                    # Nothing to decode or normalize
+                    houses[house_id] = self.data.houses[house_id]
+                    continue
+
+                decode_start = time.perf_counter()
+                data = json_loads(body)
+                decode_time += time.perf_counter() - decode_start
+
+                # Log a sample of the data for debugging
+                if _LOGGER.isEnabledFor(logging.DEBUG) and data and isinstance(data, list):
+                    _LOGGER.debug("Received data for %d floors of house %s", len(data), house_id)
+                    # Sample the first floor for debugging
+                    first_floor = data[0]
+                    if "raeume" in first_floor and first_floor["raeume"]:
+                        sample_room = first_floor["raeume"][0]
+                        # Log without sensitive values
+                        safe_sample = {k: v for k, v in sample_room.items() 
+                                    if k not in ["password", "token"]}
+                        _LOGGER.debug("Sample room data: %s", safe_sample)
+
+                if not isinstance(data, list):
+                    raise UpdateFailed(f"Unexpected data format: {type(data).__name__}")
+                if not data:
+                    # A controller starting up answers without floors
+                    raise UpdateFailed(f"No floors reported for house {house_id}")
+                normalize_start = time.perf_counter()
+                houses[house_id] = ContromeHouse.from_payload(data, house_id)
+                normalize_time += time.perf_counter() - normalize_start
+                self._payloads[house_id] = data
+                digests[house_id] = digest
+
+            if not digests:
+                # No house changed, nothing to dispatch either
+                self.skipped_polls += 1
+                _LOGGER.debug("Payload unchanged, %d of %d polls skipped (%.0f%%)",
+                            self.skipped_polls, self.poll_count, self.skip_ratio * 100)
+                self._changed_keys = set()
+                self._max_temperature_delta = 0.0
+                if self._missing_polls:
+                    # An unchanged payload still counts towards removing elements
+                    self._update_topology(self._topology_signature)
+                self._close_breaker()
+                self._adapt_update_interval(fetch_time)
+                cycle.result = "unchanged"
+                self._undispatched_cycle = cycle
+                return self.data
+
+            normalize_start = time.perf_counter()
+            system = self._process_houses(houses)
+            normalize_time += time.perf_counter() - normalize_start
+            self.metrics.record(METRIC_DECODE, decode_time * 1000)
+            self.metrics.record(METRIC_NORMALIZE, normalize_time * 1000)
+            cycle.phases.update(decode=decode_time * 1000, normalize=normalize_time * 1000)
+            self._payload_digests.update(digests)
+            if self._changed_keys:
+                self._async_save_snapshot()
+            self._close_breaker()
+            self._adapt_update_interval(fetch_time)
+            if self.stale:
+                # Entities drop their stale flag, so all of them are updated
+                self.stale = False
+                self._changed_keys = None
+            cycle.result = "updated"
+            self._undispatched_cycle = cycle
+            return system
         except Exception as ex:
-            _LOGGER.error("Error communicating with API: %s", str(ex))
-            raise UpdateFailed(f"Error communicating with API: {str(ex)}") 
\ No newline at end of file
+            cycle.result = "failed"
+            cycle.error = str(ex) or type(ex).__name__
+            self._undispatched_cycle = cycle
+            system = self._handle_failure(ex)
+            # The last good data is served
+            cycle.result = "stale"
+            return system
\ No newline at end of file
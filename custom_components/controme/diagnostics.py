@@ -0,0 +1,62 @@
+"""Diagnostics support for the Controme integration."""
+from typing import Any, Dict
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
+
+from .const import CONF_PASSWORD, CONF_USER, DOMAIN
+
+TO_REDACT = {CONF_USER, CONF_PASSWORD}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> Dict[str, Any]:
+    """Return the state of the coordinator and a trace of its recent cycles."""
+    entry_diagnostics = {
+        "data": async_redact_data(dict(entry.data), TO_REDACT),
+        "options": dict(entry.options),
+        "state": entry.state.value,
+        "reason": entry.reason,
+    }
+    entry_data = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if entry_data is None:
+        # Failed setup or unloaded, there is no coordinator to report on
+        return {"entry": entry_diagnostics}
+
+    coordinator = entry_data["coordinator"]
+    topology = entry_data["topology"]
+
+    rooms_per_house: Dict[str, int] = {house_id: 0 for house_id in topology.house_ids}
+    for room in topology.rooms:
+        rooms_per_house[room.house_id] = rooms_per_house.get(room.house_id, 0) + 1
+
+    return {
+        "entry": entry_diagnostics,
+        "coordinator": {
+            "house_ids": coordinator.house_ids,
+            "update_interval": coordinator.update_interval.total_seconds(),
+            "last_update_success": coordinator.last_update_success,
+            "stale": coordinator.stale,
+            "failures": coordinator.failures,
+            "breaker_open": coordinator.breaker_open,
+            "poll_count": coordinator.poll_count,
+            "skipped_polls": coordinator.skipped_polls,
+            "skip_ratio": round(coordinator.skip_ratio, 3),
+        },
+        "topology": {
+            "rooms": len(topology.rooms),
+            "rooms_per_house": rooms_per_house,
+            "room_entities": topology.entity_count,
+            "entities": len(er.async_entries_for_config_entry(er.async_get(hass), entry.entry_id)),
+            "devices": len(dr.async_entries_for_config_entry(dr.async_get(hass), entry.entry_id)),
+        },
+        "scheduler": coordinator.scheduler.metrics,
+        "metrics": coordinator.metrics.as_dict(),
+        # Oldest first, durations in milliseconds
+        "cycles": [cycle.as_dict() for cycle in coordinator.metrics.cycles],
+        "writes": [write.as_dict() for write in coordinator.metrics.writes],
+    }
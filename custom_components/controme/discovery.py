@@ -0,0 +1,90 @@
+"""Cache of Controme controllers found by earlier discovery runs."""
+from datetime import timedelta
+import logging
+from typing import Any, Dict, List
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DISCOVERY_STORAGE_KEY, DISCOVERY_STORAGE_VERSION
+from .helpers import probe_controme_hosts, read_neighbor_table
+
+_LOGGER = logging.getLogger(__name__)
+
+# Controllers not seen for this long are dropped from the cache
+CACHE_MAX_AGE = timedelta(days=90)
+
+
+class ContromeDiscoveryCache:
+    """Known controllers by IP with the time they were last seen and their MAC."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the cache."""
+        self.hass = hass
+        self._store = Store(hass, DISCOVERY_STORAGE_VERSION, DISCOVERY_STORAGE_KEY)
+        self._hosts: Dict[str, Dict[str, Any]] = {}
+
+    async def async_load(self) -> None:
+        """Load the cache and drop controllers not seen for a long time."""
+        stored = await self._store.async_load() or {}
+        oldest = dt_util.utcnow() - CACHE_MAX_AGE
+        self._hosts = {
+            ip: host
+            for ip, host in stored.get("hosts", {}).items()
+            if (last_seen := dt_util.parse_datetime(host.get("last_seen", "")))
+            and last_seen >= oldest
+        }
+
+    async def async_revalidate(self) -> List[Dict[str, str]]:
+        """Probe the cached controllers in parallel and return those that answer.
+
+        Besides the cached IPs, the current IPs of the cached MACs in the
+        neighbor table are probed, so a controller that got a new address
+        from DHCP is found without a full scan.
+        """
+        await self.async_load()
+        if not self._hosts:
+            return []
+        neighbors = await self.hass.async_add_executor_job(read_neighbor_table)
+        macs = {host["mac"] for host in self._hosts.values() if host.get("mac")}
+        hosts = [
+            *self._hosts,
+            *(ip for ip, mac in neighbors.items() if mac in macs),
+        ]
+        _LOGGER.debug("Revalidating known Controme hosts %s", hosts)
+        systems = await probe_controme_hosts(
+            hosts, session=async_get_clientsession(self.hass)
+        )
+        if systems:
+            await self._async_record(systems, neighbors)
+        return systems
+
+    async def async_record(self, systems: List[Dict[str, str]]) -> None:
+        """Remember controllers that were found or set up."""
+        if not systems:
+            return
+        if not self._hosts:
+            await self.async_load()
+        neighbors = await self.hass.async_add_executor_job(read_neighbor_table)
+        await self._async_record(systems, neighbors)
+
+    async def _async_record(
+        self, systems: List[Dict[str, str]], neighbors: Dict[str, str]
+    ) -> None:
+        """Update the cache entries of the systems and save the cache."""
+        now = dt_util.utcnow().isoformat()
+        for system in systems:
+            ip = system["url"]
+            host = {"last_seen": now}
+            if mac := neighbors.get(ip) or self._hosts.get(ip, {}).get("mac"):
+                host["mac"] = mac
+                # Forget the old address of a controller that moved
+                for old_ip in [
+                    old_ip for old_ip, old in self._hosts.items()
+                    if old_ip != ip and old.get("mac") == mac
+                ]:
+                    del self._hosts[old_ip]
+            self._hosts[ip] = host
+        await self._store.async_save({"hosts": self._hosts})
@@ -1,14 +1,55 @@
 """Helper functions for Controme integration."""
 import asyncio
+from contextlib import AsyncExitStack, aclosing
 import logging
-from typing import List, Dict, Any, Optional, Set
+from typing import AsyncIterator, Callable, Iterable, Iterator, List, Dict, Any, Optional, Set
 import socket
+import struct
 import aiohttp
 import async_timeout
 from ipaddress import IPv4Network, IPv4Address, IPv4Interface
 
 _LOGGER = logging.getLogger(__name__)
 
+# Number of hosts probed at the same time and the time a TCP connect may take
+DEFAULT_SCAN_CONCURRENCY = 64
+DEFAULT_PROBE_TIMEOUT = 1.0
+
+# HTTP fingerprint of the login page, done only for hosts with an open port
+HTTP_PORT = 80
+FINGERPRINT_TIMEOUT = 3.0
+FINGERPRINT_MAX_BYTES = 4096
+CONTROME_LOGIN_TITLE = b"<title>Smart-Heat-OS - Login</title>"
+
+# Kernel neighbor (ARP) table, hosts listed there are known to be alive
+NEIGHBOR_TABLE_PATH = "/proc/net/arp"
+# Flag of resolved entries in the neighbor table
+ATF_COMPLETE = 0x2
+
+# Connection pool of an entry: the controller is a small embedded web server,
+# a few kept-alive connections serve polls and writes without new handshakes
+CONTROLLER_CONNECTION_LIMIT = 4
+CONTROLLER_KEEPALIVE_TIMEOUT = 30
+DNS_CACHE_TTL = 300
+
+# Networks larger than this prefix are only scanned around the local address
+MAX_SCAN_PREFIX = 22
+# Linux ioctls for the IPv4 address and netmask of an interface
+SIOCGIFADDR = 0x8915
+SIOCGIFNETMASK = 0x891B
+# Container and VM bridges (Docker, the Supervisor network, libvirt, LXC),
+# no controller lives there
+VIRTUAL_INTERFACE_PREFIXES = ("docker", "hassio", "br-", "veth", "virbr", "lxcbr", "cni")
+
+def create_controme_session(headers: Optional[Dict[str, str]] = None) -> aiohttp.ClientSession:
+    """Create the HTTP session of a controller with a small keep-alive pool."""
+    connector = aiohttp.TCPConnector(
+        limit_per_host=CONTROLLER_CONNECTION_LIMIT,
+        keepalive_timeout=CONTROLLER_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=DNS_CACHE_TTL,
+    )
+    return aiohttp.ClientSession(connector=connector, headers=headers)
+
 def get_local_ip() -> Optional[str]:
     """Get the local IP address of the machine."""
     try:
@@ -24,6 +65,86 @@ def get_local_ip() -> Optional[str]:
         _LOGGER.error("Error getting local IP: %s", err)
         return None
 
+def get_local_interfaces() -> List[str]:
+    """Return the local IPv4 interfaces as 'address/prefix' strings.
+
+    Reads the addresses of all network interfaces directly, so unlike
+    get_local_ip it works without a default route. Container and VM
+    bridges are skipped. Linux only, other systems return an empty list.
+    """
+    interfaces = []
+    try:
+        import fcntl  # pylint: disable=import-outside-toplevel
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    except (ImportError, OSError) as err:
+        _LOGGER.debug("Cannot list network interfaces: %s", err)
+        return interfaces
+
+    try:
+        for _, name in socket.if_nameindex():
+            if name.startswith(VIRTUAL_INTERFACE_PREFIXES):
+                _LOGGER.debug("Skipping virtual interface %s", name)
+                continue
+            request = struct.pack("256s", name.encode()[:15])
+            try:
+                address = fcntl.ioctl(sock.fileno(), SIOCGIFADDR, request)[20:24]
+                netmask = fcntl.ioctl(sock.fileno(), SIOCGIFNETMASK, request)[20:24]
+            except OSError:
+                # Interface without IPv4 address
+                continue
+            interface = IPv4Interface(f"{socket.inet_ntoa(address)}/{socket.inet_ntoa(netmask)}")
+            _LOGGER.debug("Found interface %s with %s", name, interface)
+            interfaces.append(str(interface))
+    except OSError as err:
+        _LOGGER.debug("Cannot list network interfaces: %s", err)
+    finally:
+        sock.close()
+    return interfaces
+
+def get_scan_networks(interfaces: Iterable[str]) -> List[str]:
+    """Return the networks to scan for 'address/prefix' interfaces.
+
+    Loopback interfaces are skipped and networks larger than MAX_SCAN_PREFIX
+    are reduced to the part around the local address.
+    """
+    networks = []
+    for value in interfaces:
+        try:
+            interface = IPv4Interface(value)
+        except ValueError:
+            _LOGGER.error("Invalid interface format: %s", value)
+            continue
+        if interface.is_loopback or interface.network.prefixlen > 30:
+            continue
+        network = interface.network
+        if network.prefixlen < MAX_SCAN_PREFIX:
+            network = IPv4Interface(f"{interface.ip}/{MAX_SCAN_PREFIX}").network
+            _LOGGER.info("Network %s is large, scanning only %s", interface.network, network)
+        if str(network) not in networks:
+            networks.append(str(network))
+    return networks
+
+def read_neighbor_table(path: str = NEIGHBOR_TABLE_PATH) -> Dict[str, str]:
+    """Return IP -> MAC of the resolved entries of the kernel neighbor table.
+
+    Only available on Linux, other systems return an empty table.
+    """
+    neighbors = {}
+    try:
+        with open(path, encoding="ascii") as table:
+            next(table, None)  # Skip header
+            for line in table:
+                fields = line.split()
+                if len(fields) < 4:
+                    continue
+                ip, _, flags, mac = fields[:4]
+                if int(flags, 16) & ATF_COMPLETE and mac != "00:00:00:00:00:00":
+                    neighbors[ip] = mac
+    except (OSError, ValueError) as err:
+        _LOGGER.debug("Neighbor table not available: %s", err)
+    return neighbors
+
 def get_network_from_ip(ip: str) -> Optional[str]:
     """Get the network address from an IP address."""
     try:
@@ -36,126 +157,263 @@ def get_network_from_ip(ip: str) -> Optional[str]:
         _LOGGER.error("Error determining network from IP %s: %s", ip, err)
         return None
 
-async def test_controme_host(session: aiohttp.ClientSession, ip: str) -> Optional[Dict[str, str]]:
-    """Test if the given IP is a Controme system by checking the login page."""
+async def is_port_open(ip: str, port: int = HTTP_PORT, timeout: float = DEFAULT_PROBE_TIMEOUT) -> bool:
+    """Check with a plain TCP connect whether a host accepts connections on a port."""
+    try:
+        async with async_timeout.timeout(timeout):
+            _, writer = await asyncio.open_connection(ip, port)
+    except (asyncio.TimeoutError, OSError):
+        return False
+
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
+
+async def fingerprint_controme_host(
+    session: aiohttp.ClientSession, ip: str, timeout: float = FINGERPRINT_TIMEOUT
+) -> Optional[Dict[str, str]]:
+    """Check the login page title, reading no more of the page than needed."""
     # Only check the specific login page URL
     login_url = f"http://{ip}/accounts/m_login/"
-    
+
     try:
-        # Check the login page with a short timeout
-        async with async_timeout.timeout(1):
+        async with async_timeout.timeout(timeout):
             async with session.get(login_url) as response:
-                if response.status == 200:
-                    # Check for the specific title in the HTML
-                    text = await response.text()
-                    if "<title>Smart-Heat-OS - Login</title>" in text:
-                        _LOGGER.info("Found Controme system at %s", ip)
-                        return {"url": ip, "title": f"Controme at {ip}"}
-    except (asyncio.TimeoutError, aiohttp.ClientConnectorError, Exception):
+                if response.status != 200:
+                    return None
+                # The title sits in the head of the page, stop reading once it is there
+                head = b""
+                while len(head) < FINGERPRINT_MAX_BYTES and b"</title>" not in head:
+                    chunk = await response.content.read(FINGERPRINT_MAX_BYTES - len(head))
+                    if not chunk:
+                        break
+                    head += chunk
+                if CONTROME_LOGIN_TITLE in head:
+                    _LOGGER.info("Found Controme system at %s", ip)
+                    return {"url": ip, "title": f"Controme at {ip}"}
+    except (asyncio.TimeoutError, aiohttp.ClientError, Exception):
         # Skip any errors
         pass
-    
+
     return None
 
-async def scan_network(networks: List[str] = None) -> List[Dict[str, str]]:
-    """Scan network for Controme systems and stop after finding one."""
-    start_time = asyncio.get_event_loop().time()
-    
+async def test_controme_host(
+    session: aiohttp.ClientSession, ip: str, timeout: float = DEFAULT_PROBE_TIMEOUT
+) -> Optional[Dict[str, str]]:
+    """Test if the given IP is a Controme system.
+
+    A cheap TCP connect to port 80 comes first, only hosts with an open port
+    get the HTTP fingerprint of the login page.
+    """
+    if not await is_port_open(ip, HTTP_PORT, timeout):
+        return None
+    return await fingerprint_controme_host(session, ip)
+
+async def stream_controme_hosts(
+    session: aiohttp.ClientSession,
+    hosts: Iterable[str],
+    concurrency: int = DEFAULT_SCAN_CONCURRENCY,
+    probe_timeout: float = DEFAULT_PROBE_TIMEOUT,
+    on_probed: Optional[Callable[[], None]] = None,
+) -> AsyncIterator[Dict[str, str]]:
+    """Probe hosts with a sliding window and yield Controme systems as they answer.
+
+    At most `concurrency` probes run at a time; a new probe starts as soon as
+    any running one finishes. `on_probed` is called after every finished probe.
+    Closing the iterator cancels the outstanding probes.
+    """
+    semaphore = asyncio.BoundedSemaphore(concurrency)
+    results: asyncio.Queue = asyncio.Queue()
+    probes: Set[asyncio.Task] = set()
+    done = object()
+
+    def _probe_done(task: asyncio.Task) -> None:
+        probes.discard(task)
+        semaphore.release()
+        if task.cancelled():
+            return
+        if on_probed is not None:
+            on_probed()
+        if task.exception() is None and task.result():
+            results.put_nowait(task.result())
+
+    async def _feed() -> None:
+        for ip in hosts:
+            await semaphore.acquire()
+            task = asyncio.create_task(test_controme_host(session, ip, probe_timeout))
+            probes.add(task)
+            task.add_done_callback(_probe_done)
+        while probes:
+            await asyncio.wait(set(probes))
+        results.put_nowait(done)
+
+    feeder = asyncio.create_task(_feed())
+    try:
+        while (result := await results.get()) is not done:
+            yield result
+    finally:
+        feeder.cancel()
+        outstanding = [feeder, *probes]
+        for task in outstanding:
+            task.cancel()
+        await asyncio.gather(*outstanding, return_exceptions=True)
+
+def _scan_session(concurrency: int) -> aiohttp.ClientSession:
+    """Create a session for a scan, one connection per probe without keep-alive."""
+    connector = aiohttp.TCPConnector(limit=concurrency, force_close=True)
+    return aiohttp.ClientSession(
+        connector=connector, timeout=aiohttp.ClientTimeout(total=30)
+    )
+
+async def probe_controme_hosts(
+    hosts: Iterable[str],
+    probe_timeout: float = DEFAULT_PROBE_TIMEOUT,
+    session: Optional[aiohttp.ClientSession] = None,
+) -> List[Dict[str, str]]:
+    """Probe a few known hosts at once and return all that answer as Controme."""
+    hosts = list(dict.fromkeys(hosts))
+    if not hosts:
+        return []
+    if session is None:
+        async with _scan_session(len(hosts)) as own_session:
+            return await probe_controme_hosts(hosts, probe_timeout, own_session)
+    return [
+        result
+        async for result in stream_controme_hosts(session, hosts, len(hosts), probe_timeout)
+    ]
+
+def _iter_scan_hosts(
+    network: str, local_ips: Set[str], neighbors: Iterable[str] = ()
+) -> Iterator[str]:
+    """Return the hosts of a network lazily, known neighbors first."""
+    ip_network = IPv4Network(network)
+    seeded = [
+        ip_str for ip_str in neighbors
+        if ip_str not in local_ips and IPv4Address(ip_str) in ip_network
+    ]
+
+    def _hosts() -> Iterator[str]:
+        yield from seeded
+        skip = set(seeded) | local_ips
+        for ip in ip_network.hosts():
+            ip_str = str(ip)
+            if ip_str not in skip:
+                yield ip_str
+
+    return _hosts()
+
+def _interleave(iterators: List[Iterator[str]]) -> Iterator[str]:
+    """Take hosts from all networks in turn, so they are scanned side by side."""
+    while iterators:
+        for iterator in list(iterators):
+            try:
+                yield next(iterator)
+            except StopIteration:
+                iterators.remove(iterator)
+
+async def iter_network_scan(
+    networks: Optional[List[str]] = None,
+    concurrency: int = DEFAULT_SCAN_CONCURRENCY,
+    probe_timeout: float = DEFAULT_PROBE_TIMEOUT,
+    interfaces: Optional[List[str]] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    session: Optional[aiohttp.ClientSession] = None,
+) -> AsyncIterator[Dict[str, str]]:
+    """Scan networks and yield Controme systems as they are found.
+
+    `interfaces` are the local IPv4 interfaces as 'address/prefix'; they are
+    read from the system when neither they nor `networks` are given. All
+    networks are scanned at the same time and share the `concurrency` budget.
+    `on_progress` is called with the number of probed and of all hosts.
+    Without a `session` the scan uses its own one for the time of the scan.
+    """
+    loop = asyncio.get_running_loop()
+
+    if interfaces is None and networks is None:
+        interfaces = await loop.run_in_executor(None, get_local_interfaces)
+    local_ips = {str(IPv4Interface(value).ip) for value in interfaces or ()}
+
     if networks is None:
-        # Get local network from Home Assistant's IP
-        local_ip = get_local_ip()
-        if local_ip:
-            network = get_network_from_ip(local_ip)
-            if network:
-                _LOGGER.info("Detected local network: %s", network)
-                networks = [network]
-            else:
-                _LOGGER.warning("Could not determine local network, using default networks")
-                networks = ["192.168.1.0/24"]
+        networks = get_scan_networks(interfaces)
+    if not networks:
+        # Last resort, needs a default route
+        local_ip = await loop.run_in_executor(None, get_local_ip)
+        network = get_network_from_ip(local_ip) if local_ip else None
+        if network:
+            _LOGGER.info("Detected local network: %s", network)
+            local_ips.add(local_ip)
+            networks = [network]
         else:
-            _LOGGER.warning("Could not determine local IP, using default networks")
+            _LOGGER.warning("Could not determine local network, using default networks")
             networks = ["192.168.1.0/24"]
-    
-    # Optimize connection settings for faster scanning
-    connector = aiohttp.TCPConnector(limit_per_host=10, limit=100)
-    timeout = aiohttp.ClientTimeout(total=30)
-    
-    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-        for network in networks:
-            _LOGGER.info("Scanning network %s for Controme systems", network)
-            
-            try:
-                # Create a single list of all IPs to scan
-                all_ips = []
-                
-                # Prioritize some common IPs first
-                priority_ips = [
-                    "192.168.1.100",
-                    "192.168.1.200",
-                    "192.168.1.10",
-                    "192.168.1.20",
-                    "192.168.0.100",
-                    "192.168.0.200"
-                ]
-                
-                try:
-                    ip_network = IPv4Network(network)
-                    local_ip = get_local_ip()
-                    
-                    # Add all IPs to the list, prioritizing common ones
-                    for ip in ip_network.hosts():
-                        ip_str = str(ip)
-                        if ip_str == local_ip:
-                            continue  # Skip local IP
-                        
-                        if ip_str in priority_ips:
-                            # Add priority IPs to the beginning
-                            all_ips.insert(0, ip_str)
-                        else:
-                            # Add regular IPs to the end
-                            all_ips.append(ip_str)
-                except ValueError:
-                    _LOGGER.error("Invalid network format: %s", network)
-                    continue
-                
-                # Optimize chunk size for faster scanning
-                chunk_size = 40
-                
-                # Process all IPs in a single pass with optimized chunks
-                for i in range(0, len(all_ips), chunk_size):
-                    chunk_ips = all_ips[i:i + chunk_size]
-                    _LOGGER.debug("Scanning IPs %d to %d of %d", 
-                                 i, min(i+chunk_size, len(all_ips)), len(all_ips))
-                    
-                    # Create tasks for this chunk
-                    chunk_tasks = [test_controme_host(session, ip) for ip in chunk_ips]
-                    
-                    # Run all tasks in parallel
-                    chunk_results = await asyncio.gather(*chunk_tasks, return_exceptions=True)
-                    
-                    # Process results
-                    discovered_systems = []
-                    for ip, result in zip(chunk_ips, chunk_results):
-                        if isinstance(result, Exception):
-                            continue
-                        if result:
-                            discovered_systems.append(result)
-                            _LOGGER.info("Found Controme system: %s", result["url"])
-                    
-                    # If we found any systems, return immediately
-                    if discovered_systems:
-                        end_time = asyncio.get_event_loop().time()
-                        scan_duration = end_time - start_time
-                        _LOGGER.info("Network scan completed in %.2f seconds. Found %d Controme systems", 
-                                   scan_duration, len(discovered_systems))
-                        return discovered_systems
-                
-            except Exception as e:
-                _LOGGER.error("Error scanning network %s: %s", network, str(e))
-                continue
-    
+
+    # Hosts in the neighbor table answered recently, the controller is usually among them
+    neighbors = await loop.run_in_executor(None, read_neighbor_table)
+    _LOGGER.debug("Seeding the scan with %d known neighbors", len(neighbors))
+
+    host_iterators = []
+    total = 0
+    for network in networks:
+        try:
+            host_iterators.append(_iter_scan_hosts(network, local_ips, neighbors))
+        except ValueError:
+            _LOGGER.error("Invalid network format: %s", network)
+            continue
+        total += max(IPv4Network(network).num_addresses - 2, 1)
+    _LOGGER.info("Scanning %d hosts in networks %s for Controme systems", total, ", ".join(networks))
+
+    probed = 0
+
+    def _probed() -> None:
+        nonlocal probed
+        probed += 1
+        if on_progress is not None:
+            on_progress(probed, total)
+
+    async with AsyncExitStack() as stack:
+        if session is None:
+            session = await stack.enter_async_context(_scan_session(concurrency))
+        # Closing the stream cancels the outstanding probes
+        probes = await stack.enter_async_context(
+            aclosing(
+                stream_controme_hosts(
+                    session, _interleave(host_iterators), concurrency, probe_timeout, _probed
+                )
+            )
+        )
+        async for result in probes:
+            yield result
+
+async def scan_network(
+    networks: Optional[List[str]] = None,
+    concurrency: int = DEFAULT_SCAN_CONCURRENCY,
+    probe_timeout: float = DEFAULT_PROBE_TIMEOUT,
+    interfaces: Optional[List[str]] = None,
+    session: Optional[aiohttp.ClientSession] = None,
+) -> List[Dict[str, str]]:
+    """Scan networks for Controme systems and stop after finding one."""
+    start_time = asyncio.get_event_loop().time()
+
+    try:
+        async with aclosing(
+            iter_network_scan(
+                networks, concurrency, probe_timeout, interfaces, session=session
+            )
+        ) as scan:
+            # The first answer wins
+            async for result in scan:
+                scan_duration = asyncio.get_event_loop().time() - start_time
+                _LOGGER.info("Network scan completed in %.2f seconds. Found Controme system: %s",
+                           scan_duration, result["url"])
+                return [result]
+    except Exception as e:
+        _LOGGER.error("Error scanning networks %s: %s", networks, str(e))
+
     # If we get here, no systems were found
     end_time = asyncio.get_event_loop().time()
     scan_duration = end_time - start_time
     _LOGGER.info("Network scan completed in %.2f seconds. No Controme systems found", scan_duration)
-    return [] 
\ No newline at end of file
+    return []
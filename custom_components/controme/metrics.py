@@ -0,0 +1,163 @@
+"""Rolling statistics of the update cycles of a coordinator."""
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+import math
+from typing import Any, Deque, Dict, Optional, Union
+
+# Number of recent samples the statistics are computed from
+DEFAULT_WINDOW = 100
+# Number of recent update cycles and target writes kept for diagnostics
+DEFAULT_TRACE_LENGTH = 50
+
+# Recorded per poll: durations in milliseconds, sizes in bytes
+METRIC_FETCH = "fetch_time"
+METRIC_TTFB = "time_to_first_byte"
+METRIC_PAYLOAD_SIZE = "payload_size"
+METRIC_DECODE = "decode_time"
+METRIC_NORMALIZE = "normalize_time"
+# Recorded per dispatch to the entities
+METRIC_DISPATCH = "dispatch_time"
+METRIC_STATE_WRITES = "state_writes"
+
+METRICS = (
+    METRIC_FETCH,
+    METRIC_TTFB,
+    METRIC_PAYLOAD_SIZE,
+    METRIC_DECODE,
+    METRIC_NORMALIZE,
+    METRIC_DISPATCH,
+    METRIC_STATE_WRITES,
+)
+
+
+class RollingStats:
+    """Percentiles and maximum of the most recent samples."""
+
+    __slots__ = ("_samples",)
+
+    def __init__(self, window: int = DEFAULT_WINDOW) -> None:
+        """Initialize the statistics."""
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        """Return the number of samples."""
+        return len(self._samples)
+
+    def add(self, value: float) -> None:
+        """Add a sample, the oldest one drops out of a full window."""
+        self._samples.append(value)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Return the nearest-rank percentile, None without samples."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+        return ordered[rank - 1]
+
+    @property
+    def p50(self) -> Optional[float]:
+        """Return the median."""
+        return self.percentile(50)
+
+    @property
+    def p95(self) -> Optional[float]:
+        """Return the 95th percentile."""
+        return self.percentile(95)
+
+    @property
+    def max(self) -> Optional[float]:
+        """Return the largest sample."""
+        return max(self._samples, default=None)
+
+    def as_dict(self) -> Dict[str, Optional[float]]:
+        """Return the statistics for attributes and diagnostics."""
+        return {
+            "p50": self.p50,
+            "p95": self.p95,
+            "max": self.max,
+            "samples": len(self._samples),
+        }
+
+
+@dataclass(slots=True)
+class UpdateCycle:
+    """Trace of one poll of the controller, durations in milliseconds."""
+
+    started: datetime
+    # Per house: status code, time to first byte, payload size and hash
+    houses: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # Duration of the fetch, decode, normalize and dispatch phases
+    phases: Dict[str, float] = field(default_factory=dict)
+    # updated, unchanged, stale or failed
+    result: Optional[str] = None
+    error: Optional[str] = None
+    state_writes: Optional[int] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the trace for diagnostics."""
+        data = asdict(self)
+        data["started"] = self.started.isoformat()
+        return data
+
+
+@dataclass(slots=True)
+class TargetWrite:
+    """Trace of one target temperature write, durations in milliseconds."""
+
+    started: datetime
+    house_id: str
+    room_id: Any
+    # HTTP status code or the name of the exception
+    status: Union[int, str, None] = None
+    # From the first set_temperature call of a coalesced burst to the response
+    total: Optional[float] = None
+    # Waiting for a slot of the request scheduler
+    wait: Optional[float] = None
+    request: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the trace for diagnostics."""
+        data = asdict(self)
+        data["started"] = self.started.isoformat()
+        return data
+
+
+class ContromeMetrics:
+    """Rolling statistics of all metrics of a coordinator."""
+
+    def __init__(
+        self, window: int = DEFAULT_WINDOW, trace_length: int = DEFAULT_TRACE_LENGTH
+    ) -> None:
+        """Initialize the metrics."""
+        self._stats: Dict[str, RollingStats] = {
+            metric: RollingStats(window) for metric in METRICS
+        }
+        # Ring buffers of the most recent polls and writes
+        self.cycles: Deque[UpdateCycle] = deque(maxlen=trace_length)
+        self.writes: Deque[TargetWrite] = deque(maxlen=trace_length)
+
+    def start_cycle(self, started: datetime) -> UpdateCycle:
+        """Add the trace of a new poll, the oldest one drops out."""
+        cycle = UpdateCycle(started)
+        self.cycles.append(cycle)
+        return cycle
+
+    def start_write(self, started: datetime, house_id: str, room_id: Any) -> TargetWrite:
+        """Add the trace of a new target write, the oldest one drops out."""
+        write = TargetWrite(started, house_id, room_id)
+        self.writes.append(write)
+        return write
+
+    def record(self, metric: str, value: float) -> None:
+        """Add a sample to a metric."""
+        self._stats[metric].add(value)
+
+    def get(self, metric: str) -> RollingStats:
+        """Return the statistics of a metric."""
+        return self._stats[metric]
+
+    def as_dict(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Return the statistics of all metrics."""
+        return {metric: stats.as_dict() for metric, stats in self._stats.items()}
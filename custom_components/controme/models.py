@@ -0,0 +1,178 @@
+"""Typed model of the Controme /temps/ payload."""
+from dataclasses import dataclass, field
+import sys
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+# (house_id, floor_id, room_id)
+RoomKey = Tuple[Any, Any, Any]
+# A room (None), one of its values (API key) or return sensors ("return_<name>")
+TopologyElement = Tuple[RoomKey, Optional[str]]
+
+# API keys of the room values and the model attributes holding them
+FIELD_ATTRIBUTES: Dict[str, str] = {
+    "temperatur": "temperature",
+    "solltemperatur": "target_temperature",
+    "luftfeuchte": "humidity",
+    "total_offset": "total_offset",
+    "betriebsart": "operation_mode",
+}
+
+RETURN_SENSOR_MARKER = "Rücklauf"
+
+
+def parse_float(value: Any) -> Optional[float]:
+    """Return a numeric API value as float, None for texts like 'kein Sensor vorhanden'."""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def intern_str(value: Any) -> Optional[str]:
+    """Intern a text value, names and modes repeat on every poll."""
+    if value is None:
+        return None
+    return sys.intern(str(value))
+
+
+@dataclass(slots=True)
+class ContromeReturnSensor:
+    """A return flow temperature sensor of a room."""
+
+    name: str
+    description: str
+    value: Optional[float]
+
+    @property
+    def available(self) -> bool:
+        """Return True if the sensor reports a numeric value."""
+        return self.value is not None
+
+    @classmethod
+    def from_payload(cls, data: Dict[str, Any]) -> "ContromeReturnSensor":
+        """Create the sensor from its API data."""
+        return cls(
+            name=intern_str(data.get("name")),
+            description=intern_str(data.get("beschreibung", "")),
+            value=parse_float(data.get("wert")),
+        )
+
+
+@dataclass(slots=True)
+class ContromeRoom:
+    """A room with its values already parsed."""
+
+    id: Any
+    house_id: Any
+    floor_id: Any
+    name: str
+    temperature: Optional[float]
+    target_temperature: Optional[float]
+    humidity: Optional[float]
+    total_offset: Optional[float]
+    operation_mode: Optional[str]
+    return_sensors: Dict[str, ContromeReturnSensor]
+    # API keys present in the payload, entities are only created for these
+    fields: FrozenSet[str]
+
+    @property
+    def key(self) -> RoomKey:
+        """Return the key of the room within the controller."""
+        return (self.house_id, self.floor_id, self.id)
+
+    def has(self, api_key: str) -> bool:
+        """Return True if the payload contained the given API key."""
+        return api_key in self.fields
+
+    def value(self, api_key: str) -> Any:
+        """Return the parsed value for an API key."""
+        return getattr(self, FIELD_ATTRIBUTES[api_key])
+
+    @classmethod
+    def from_payload(
+        cls, data: Dict[str, Any], floor_id: Any, house_id: Any = None
+    ) -> "ContromeRoom":
+        """Create the room from its API data."""
+        room_id = data.get("id")
+        return_sensors = {}
+        for sensor in data.get("sensoren", []):
+            if RETURN_SENSOR_MARKER in sensor.get("beschreibung", ""):
+                return_sensor = ContromeReturnSensor.from_payload(sensor)
+                return_sensors[return_sensor.name] = return_sensor
+        return cls(
+            id=room_id,
+            house_id=house_id,
+            floor_id=floor_id,
+            name=intern_str(data.get("name", f"Room {room_id}")),
+            temperature=parse_float(data.get("temperatur")),
+            target_temperature=parse_float(data.get("solltemperatur")),
+            humidity=parse_float(data.get("luftfeuchte")),
+            total_offset=parse_float(data.get("total_offset")),
+            operation_mode=intern_str(data.get("betriebsart")),
+            return_sensors=return_sensors,
+            fields=frozenset(key for key in FIELD_ATTRIBUTES if key in data),
+        )
+
+
+@dataclass(slots=True)
+class ContromeFloor:
+    """A floor and its rooms."""
+
+    id: Any
+    name: str
+    rooms: List[ContromeRoom]
+
+    @classmethod
+    def from_payload(cls, data: Dict[str, Any], house_id: Any = None) -> "ContromeFloor":
+        """Create the floor from its API data."""
+        floor_id = data.get("id")
+        raw_rooms = data.get("raeume", [])
+        # Some installations report the values on the floor itself
+        if not raw_rooms and ("temperatur" in data or "solltemperatur" in data):
+            raw_rooms = [data]
+        return cls(
+            id=floor_id,
+            name=intern_str(data.get("etagenname", f"Floor {floor_id}")),
+            rooms=[ContromeRoom.from_payload(room, floor_id, house_id) for room in raw_rooms],
+        )
+
+
+@dataclass(slots=True)
+class ContromeHouse:
+    """All floors of a house plus an index of its rooms."""
+
+    id: Any
+    floors: List[ContromeFloor]
+    rooms: Dict[RoomKey, ContromeRoom] = field(default_factory=dict)
+
+    @classmethod
+    def from_payload(cls, data: List[Dict[str, Any]], house_id: Any = None) -> "ContromeHouse":
+        """Normalize the /temps/ payload of a house."""
+        floors = [ContromeFloor.from_payload(floor, house_id) for floor in data]
+        rooms = {room.key: room for floor in floors for room in floor.rooms}
+        return cls(id=house_id, floors=floors, rooms=rooms)
+
+
+@dataclass(slots=True)
+class ContromeSystem:
+    """All houses of a controller plus an index of their rooms."""
+
+    houses: Dict[Any, ContromeHouse]
+    rooms: Dict[RoomKey, ContromeRoom] = field(default_factory=dict)
+
+    @classmethod
+    def from_houses(cls, houses: Dict[Any, ContromeHouse]) -> "ContromeSystem":
+        """Combine the houses, unchanged houses are reused as they are."""
+        rooms = {key: room for house in houses.values() for key, room in house.rooms.items()}
+        return cls(houses=houses, rooms=rooms)
+
+    def topology_elements(self) -> FrozenSet[TopologyElement]:
+        """Return the rooms, values and return sensors that entities exist for."""
+        elements = set()
+        for key, room in self.rooms.items():
+            elements.add((key, None))
+            elements.update((key, api_key) for api_key in room.fields)
+            elements.update((key, f"return_{name}") for name in room.return_sensors)
+        return frozenset(elements)
@@ -0,0 +1,165 @@
+"""Prioritized, rate-limited scheduling of the requests to a controller."""
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from enum import IntEnum
+import heapq
+import itertools
+import logging
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from .helpers import CONTROLLER_CONNECTION_LIMIT
+
+_LOGGER = logging.getLogger(__name__)
+
+# The controller is a small embedded web server: requests per second it is
+# asked to serve on average and short bursts above that; parallel requests
+# are limited to the connection pool of the entry
+DEFAULT_REQUEST_RATE = 5.0
+DEFAULT_REQUEST_BURST = 5
+DEFAULT_MAX_CONCURRENT = CONTROLLER_CONNECTION_LIMIT
+
+
+class RequestPriority(IntEnum):
+    """Order in which waiting requests are sent, lower first."""
+
+    # Target temperatures set by the user
+    WRITE = 0
+    # Polls in the fast window after changes and read-backs of written targets
+    POLL = 1
+    # Routine polls
+    BACKGROUND = 2
+
+
+@dataclass(slots=True)
+class PriorityMetrics:
+    """Wait times of the requests of one priority."""
+
+    requests: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def average_wait(self) -> float:
+        """Return the average time a request waited for its turn."""
+        return self.total_wait / self.requests if self.requests else 0.0
+
+
+class ContromeRequestScheduler:
+    """Hand out request slots by priority within a token bucket rate limit."""
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_REQUEST_RATE,
+        burst: int = DEFAULT_REQUEST_BURST,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+    ) -> None:
+        """Initialize the scheduler."""
+        self._rate = rate
+        self._burst = burst
+        self._max_concurrent = max_concurrent
+        self._tokens = float(burst)
+        self._refilled_at: Optional[float] = None
+        self._in_flight = 0
+        # Waiting requests as (priority, sequence, future), FIFO within a priority
+        self._waiting: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._metrics: Dict[RequestPriority, PriorityMetrics] = {
+            priority: PriorityMetrics() for priority in RequestPriority
+        }
+        self.max_queue_depth = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Return the number of requests waiting for a slot."""
+        return sum(1 for _, _, future in self._waiting if not future.done())
+
+    @property
+    def metrics(self) -> dict:
+        """Return queue depth and wait times per priority."""
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "in_flight": self._in_flight,
+            "priorities": {
+                priority.name.lower(): {
+                    "requests": metrics.requests,
+                    "average_wait": round(metrics.average_wait, 3),
+                    "max_wait": round(metrics.max_wait, 3),
+                }
+                for priority, metrics in self._metrics.items()
+            },
+        }
+
+    @asynccontextmanager
+    async def slot(self, priority: RequestPriority) -> AsyncIterator[None]:
+        """Wait for the turn of a request and hold its slot while it runs."""
+        loop = asyncio.get_running_loop()
+        queued_at = loop.time()
+        future = loop.create_future()
+        heapq.heappush(self._waiting, (priority, next(self._sequence), future))
+        self.max_queue_depth = max(self.max_queue_depth, len(self._waiting))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just before the cancellation, give the slot back
+                self._release()
+            raise
+
+        wait = loop.time() - queued_at
+        metrics = self._metrics[priority]
+        metrics.requests += 1
+        metrics.total_wait += wait
+        metrics.max_wait = max(metrics.max_wait, wait)
+        if wait > 1:
+            _LOGGER.debug("%s request waited %.2f seconds for the controller", priority.name, wait)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def shutdown(self) -> None:
+        """Cancel the refill timer and all waiting requests."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for _, _, future in self._waiting:
+            future.cancel()
+        self._waiting.clear()
+
+    def _release(self) -> None:
+        """Free the slot of a finished request."""
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _refill(self, now: float) -> None:
+        """Add the tokens earned since the last refill."""
+        if self._refilled_at is not None:
+            self._tokens = min(self._burst, self._tokens + (now - self._refilled_at) * self._rate)
+        self._refilled_at = now
+
+    def _dispatch(self) -> None:
+        """Start the waiting requests that the rate and concurrency limits allow."""
+        loop = asyncio.get_running_loop()
+        self._refill(loop.time())
+        while self._waiting and self._in_flight < self._max_concurrent:
+            if self._waiting[0][2].done():
+                # Cancelled while waiting
+                heapq.heappop(self._waiting)
+                continue
+            if self._tokens < 1:
+                if self._timer is None:
+                    self._timer = loop.call_later((1 - self._tokens) / self._rate, self._on_timer)
+                return
+            _, _, future = heapq.heappop(self._waiting)
+            self._tokens -= 1
+            self._in_flight += 1
+            future.set_result(None)
+
+    def _on_timer(self) -> None:
+        """Continue dispatching once a new token is available."""
+        self._timer = None
+        self._dispatch()
@@ -11,7 +11,9 @@ from homeassistant.components.sensor import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
+    UnitOfInformation,
     UnitOfTemperature,
+    UnitOfTime,
     PERCENTAGE,
 )
 from homeassistant.core import HomeAssistant, callback
@@ -24,11 +26,23 @@ from homeassistant.helpers import device_registry as dr
 from .const import (
     DOMAIN, 
     CONF_API_URL, 
-    CONF_HAUS_ID,
     ENTITY_ID_MAP,
     VALUE_MAP,
     SENSOR_TYPE_OPERATION_MODE,
+    SENSOR_TYPE_RETURN,
+    ATTR_STALE,
 )
+from .coordinator import room_context
+from .metrics import (
+    METRIC_DECODE,
+    METRIC_DISPATCH,
+    METRIC_FETCH,
+    METRIC_NORMALIZE,
+    METRIC_PAYLOAD_SIZE,
+    METRIC_STATE_WRITES,
+    METRIC_TTFB,
+)
+from .topology import async_remove_entities
 
 from dataclasses import dataclass
 
@@ -78,94 +92,94 @@ SENSOR_TYPES: tuple[ContromeSensorEntityDescription, ...] = (
     ),
 )
 
-async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
-    """Set up the Controme sensor platform."""
-    sensors = []
-    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
-    data = coordinator.data
-    house_id = entry.data[CONF_HAUS_ID]
-
-    # Create hub device
-    hub_device_info = DeviceInfo(
-        identifiers={(DOMAIN, house_id)},
-        name="Controme Hub",
-        manufacturer="Controme",
-        model="Hub",
+def _duration_description(key: str) -> ContromeSensorEntityDescription:
+    """Describe a diagnostic sensor of a duration in milliseconds."""
+    return ContromeSensorEntityDescription(
+        key=key,
+        translation_key=key,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        suggested_display_precision=1,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
     )
 
-    _LOGGER.debug("Setting up Controme sensors with data: %s", data)
+# Hot path statistics of the coordinator, the state is the 95th percentile
+METRIC_SENSOR_TYPES: tuple[ContromeSensorEntityDescription, ...] = (
+    _duration_description(METRIC_FETCH),
+    _duration_description(METRIC_TTFB),
+    ContromeSensorEntityDescription(
+        key=METRIC_PAYLOAD_SIZE,
+        translation_key=METRIC_PAYLOAD_SIZE,
+        device_class=SensorDeviceClass.DATA_SIZE,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+    ),
+    _duration_description(METRIC_DECODE),
+    _duration_description(METRIC_NORMALIZE),
+    _duration_description(METRIC_DISPATCH),
+    ContromeSensorEntityDescription(
+        key=METRIC_STATE_WRITES,
+        translation_key=METRIC_STATE_WRITES,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+    ),
+)
 
-    if not data:
-        _LOGGER.error("No data received from coordinator")
-        return
+# Precomputed lookup of the descriptions by sensor type
+SENSOR_DESCRIPTIONS: dict[str, ContromeSensorEntityDescription] = {
+    description.key: description for description in SENSOR_TYPES
+}
 
-    # Process all floors and rooms
-    for floor in data:
-        floor_id = floor.get("id")
-        floor_name = floor.get("etagenname", f"Floor {floor_id}")
-        rooms = floor.get("raeume", [])
-        _LOGGER.debug("Processing floor %s with rooms: %s", floor_id, rooms)
-        
-        if not rooms and ("temperatur" in floor or "solltemperatur" in floor):
-            rooms = [floor]
-            _LOGGER.debug("Using floor as room because no rooms found")
-            
-        for room in rooms:
-            room_id = room.get("id")
-            if not room_id:
-                room_id = f"{floor_id}_{index}"
-            room_name = room.get("name", f"Room {room_id}")
-            _LOGGER.debug("Processing room %s with data: %s", room_name, room)
-
-            # Add room data
-            room["floor_id"] = floor_id
-            device_info = DeviceInfo(
-                identifiers={(DOMAIN, f"{house_id}_{floor_id}_{room_id}")},
-                name=room_name,
-                manufacturer="Controme",
-                model="Room",
-                via_device=(DOMAIN, house_id),
-            )
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
+    """Set up the Controme sensor platform."""
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    coordinator = entry_data["coordinator"]
+    # Sensors by (house_id, floor_id, room_id, sensor_type)
+    sensors = {}
 
-            # Add basic sensors
-            for sensor_type, data_key in VALUE_MAP.items():
-                _LOGGER.debug("Checking for %s sensor (key: %s) in room data: %s", 
-                            sensor_type, data_key, data_key in room)
-                if data_key in room:
-                    _LOGGER.debug("Adding %s sensor for room %s", sensor_type, room_name)
-                    if sensor_type == "operation_mode":
-                        sensor_class = ContromeOperationModeSensor
-                    else:
-                        sensor_class = ContromeSensor
-                    sensors.append(
-                        sensor_class(
-                            coordinator,
-                            entry,
-                            room,
-                            sensor_type,
-                            device_info,
-                        )
-                    )
-                    _LOGGER.debug("%s sensor added", sensor_type)
-
-            # Process return temperature sensors
-            for sensor in room.get("sensoren", []):
-                if "Rücklauf" in sensor.get("beschreibung", ""):
-                    _LOGGER.debug("Adding return sensor %s for room %s", 
-                                sensor.get("name"), room_name)
-                    sensors.append(
-                        ContromeSensor(
-                            coordinator,
-                            entry,
-                            room,
-                            f"return_{sensor.get('name')}",
-                            device_info,
-                        )
-                    )
-                    _LOGGER.debug("Return sensor added")
-
-    _LOGGER.debug("Created %d sensors in total", len(sensors))
-    async_add_entities(sensors)
+    @callback
+    def _async_sync_sensors() -> None:
+        """Add sensors of new rooms or values and remove the vanished ones."""
+        topology = entry_data["topology"]
+        wanted = {}
+        for room in topology.rooms:
+            sensor_types = (
+                *room.sensor_types,
+                *(f"return_{sensor_name}" for sensor_name in room.return_sensors),
+            )
+            for sensor_type in sensor_types:
+                wanted[(*room.key, sensor_type)] = (room, sensor_type)
+
+        new_sensors = []
+        for key, (room, sensor_type) in wanted.items():
+            if key in sensors:
+                continue
+            if sensor_type == SENSOR_TYPE_OPERATION_MODE:
+                sensor_class = ContromeOperationModeSensor
+            else:
+                sensor_class = ContromeSensor
+            sensors[key] = sensor_class(coordinator, entry, room, sensor_type)
+            new_sensors.append(sensors[key])
+
+        removed = [sensors.pop(key) for key in sensors.keys() - wanted.keys()]
+        if removed:
+            async_remove_entities(hass, removed)
+        if new_sensors:
+            _LOGGER.debug("Adding %d sensors for %d rooms", len(new_sensors), len(topology.rooms))
+            async_add_entities(new_sensors)
+
+    _async_sync_sensors()
+    entry.async_on_unload(coordinator.async_add_topology_listener(_async_sync_sensors))
+
+    async_add_entities(
+        ContromeMetricSensor(coordinator, entry, description)
+        for description in METRIC_SENSOR_TYPES
+    )
 
 class ContromeSensor(CoordinatorEntity, SensorEntity):
     """Representation of a Controme Sensor."""
@@ -174,11 +188,9 @@ class ContromeSensor(CoordinatorEntity, SensorEntity):
 
     def __init_sensor_description(self, sensor_type: str) -> None:
         """Initialize the sensor description based on type."""
-        base_type = sensor_type.split("_")[0]
-        self.entity_description = next(
-            (desc for desc in SENSOR_TYPES if desc.key == base_type),
-            SENSOR_TYPES[0]  # Fallback to temperature sensor
-        )
+        base_type = SENSOR_TYPE_RETURN if sensor_type.startswith("return_") else sensor_type
+        # Fallback to temperature sensor
+        self.entity_description = SENSOR_DESCRIPTIONS.get(base_type, SENSOR_TYPES[0])
 
     def __init_entity_id(self, sensor_type: str, room_name: str) -> None:
         """Initialize the entity ID."""
@@ -200,30 +212,33 @@ class ContromeSensor(CoordinatorEntity, SensorEntity):
         lookup_key = sensor_type if sensor_type == "total_offset" else base_type
         self._attr_name = name_map.get(lookup_key, sensor_type)
 
-    def __init__(self, coordinator, config_entry, room_data, sensor_type, device_info):
+    def __init__(self, coordinator, config_entry, room, sensor_type):
         """Initialize the sensor."""
-        super().__init__(coordinator)
-        _LOGGER.debug("Initializing sensor with type %s for room %s", 
-                    sensor_type, room_data.get("name"))
-        
+        field = sensor_type if sensor_type.startswith("return_") else VALUE_MAP.get(sensor_type, sensor_type)
+        super().__init__(
+            coordinator,
+            context=room_context(room.key, field),
+        )
+
         # Set basic attributes
         self._config_entry = config_entry
-        self._device_info = device_info
-        self._room_data = room_data
+        self._device_info = room.device_info
         self._sensor_type = sensor_type
-        self._room_id = room_data.get("id")
-        self._floor_id = room_data.get("floor_id")
-        self._house_id = config_entry.data[CONF_HAUS_ID]
+        self._field = field
+        self._room_key = room.key
+        self._room_id = room.room_id
+        self._floor_id = room.floor_id
+        self._house_id = room.house_id
         self._base_url = config_entry.data[CONF_API_URL].rstrip('/')
         
         # Set unique ID and entity ID
         self._attr_unique_id = f"{self._house_id}_{self._floor_id}_{self._room_id}_{sensor_type}"
         self.__init_sensor_description(sensor_type)
-        self.__init_entity_id(sensor_type, room_data.get("name", ""))
+        self.__init_entity_id(sensor_type, room.name)
         self.__init_name(sensor_type)
         
         # Set initial values
-        self._update_from_data(room_data)
+        self._update_from_data(coordinator.get_room(self._room_key))
 
     @property
     def device_info(self):
@@ -233,77 +248,57 @@ class ContromeSensor(CoordinatorEntity, SensorEntity):
     @property
     def extra_state_attributes(self):
         """Return the state attributes."""
-        return {
+        attributes = {
             "room_id": self._room_id,
             "floor_id": self._floor_id,
             "house_id": self._house_id,
         }
+        if self.coordinator.stale:
+            attributes[ATTR_STALE] = True
+        return attributes
 
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
-        for floor in self.coordinator.data:
-            if floor["id"] == self._floor_id:
-                for room in floor.get("raeume", []):
-                    if room["id"] == self._room_id:
-                        self._update_from_data(room)
-                        break
+        room = self.coordinator.get_room(self._room_key)
+        if room is not None:
+            self._update_from_data(room)
         self.async_write_ha_state()
 
     def _update_from_data(self, room_data):
         """Update sensor state from room data."""
         if self._sensor_type.startswith("return_"):
-            for sensor in room_data.get("sensoren", []):
-                sensor_id = "_".join(self._sensor_type.split("_")[1:])
-                if sensor.get("name") == sensor_id:
-                    value = sensor.get("wert")
-                    # Handle non-numeric values for numeric sensors
-                    if isinstance(value, str) and not value.replace('.', '', 1).isdigit():
-                        self._attr_native_value = None
-                        self._attr_available = False
-                    else:
-                        self._attr_native_value = value
-                        self._attr_available = True
-                    break
+            sensor = room_data.return_sensors.get(self._sensor_type[len("return_"):])
+            if sensor is None:
+                return
+            value = sensor.value
         else:
-            value = room_data.get(VALUE_MAP.get(self._sensor_type))
-            # For numeric sensors, ensure we have numeric values
-            if self.entity_description.device_class in [
-                SensorDeviceClass.TEMPERATURE, 
-                SensorDeviceClass.HUMIDITY
-            ]:
-                if not value or (isinstance(value, str) and not value.replace('.', '', 1).isdigit()):
-                    self._attr_native_value = None
-                    self._attr_available = False
-                else:
-                    try:
-                        self._attr_native_value = float(value) if value is not None else None
-                        self._attr_available = True
-                    except (ValueError, TypeError):
-                        self._attr_native_value = None
-                        self._attr_available = False
-            else:
-                self._attr_native_value = value
-                self._attr_available = value is not None
+            # Values are parsed by the coordinator, non-numeric ones are None
+            value = room_data.value(self._field)
+        self._attr_native_value = value
+        self._attr_available = value is not None
 
 class ContromeOperationModeSensor(CoordinatorEntity, SensorEntity):
     """Representation of a Controme Operation Mode Sensor."""
 
     _attr_has_entity_name = True
 
-    def __init__(self, coordinator, config_entry, room_data, sensor_type, device_info):
+    def __init__(self, coordinator, config_entry, room, sensor_type):
         """Initialize the sensor."""
-        super().__init__(coordinator)
+        super().__init__(
+            coordinator,
+            context=room_context(room.key, VALUE_MAP[SENSOR_TYPE_OPERATION_MODE]),
+        )
         self._config_entry = config_entry
-        self._device_info = device_info
-        self._room_data = room_data
-        self._room_id = room_data.get("id")
-        self._floor_id = room_data.get("floor_id")
-        self._house_id = config_entry.data[CONF_HAUS_ID]
+        self._device_info = room.device_info
+        self._room_key = room.key
+        self._room_id = room.room_id
+        self._floor_id = room.floor_id
+        self._house_id = room.house_id
         
         # Set unique ID and entity ID
         self._attr_unique_id = f"{self._house_id}_{self._floor_id}_{self._room_id}_operation_mode"
-        room_name = room_data.get("name", "")
+        room_name = room.name
         room_name_lower = room_name.lower().replace(" ", "_")
         self.entity_id = f"sensor.controme_{room_name_lower}_mode"
 
@@ -321,31 +316,77 @@ class ContromeOperationModeSensor(CoordinatorEntity, SensorEntity):
         self._attr_name = "Betriebsart"
 
         # Set initial value and availability
-        self._update_from_data(room_data)
+        self._update_from_data(coordinator.get_room(self._room_key))
 
     @property
     def device_info(self):
         """Return device info for this sensor."""
         return self._device_info
 
+    @property
+    def extra_state_attributes(self):
+        """Return the state attributes."""
+        if self.coordinator.stale:
+            return {ATTR_STALE: True}
+        return None
+
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
-        updated = False
-        for floor in self.coordinator.data:
-            if floor["id"] == self._floor_id:
-                for room in floor.get("raeume", []):
-                    if room["id"] == self._room_id:
-                        self._update_from_data(room)
-                        updated = True
-                        break
-                if updated:
-                    break
-        
+        room = self.coordinator.get_room(self._room_key)
+        if room is not None:
+            self._update_from_data(room)
         self.async_write_ha_state()
         
     def _update_from_data(self, room_data):
         """Update the sensor state from room data."""
-        value = room_data.get(VALUE_MAP["operation_mode"])
+        value = room_data.operation_mode
         self._attr_native_value = value
-        self._attr_available = value is not None
\ No newline at end of file
+        self._attr_available = value is not None
+
+class ContromeMetricSensor(SensorEntity):
+    """Rolling statistics of a hot path metric of the coordinator."""
+
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+
+    def __init__(self, coordinator, config_entry, description):
+        """Initialize the sensor."""
+        self.coordinator = coordinator
+        self.entity_description = description
+        self._stats = coordinator.metrics.get(description.key)
+        # Statistics of the last written state
+        self._written = None
+        self._attr_unique_id = f"{config_entry.entry_id}_{description.key}"
+        # The statistics cover the whole controller, shown on the first hub
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, coordinator.house_ids[0])},
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the samples of the coordinator."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.async_add_metrics_listener(self._handle_metrics_update)
+        )
+
+    @callback
+    def _handle_metrics_update(self) -> None:
+        """Write the state only when the statistics changed."""
+        statistics = (self._stats.p95, self._stats.p50, self._stats.max)
+        if statistics != self._written:
+            self._written = statistics
+            self.async_write_ha_state()
+
+    @property
+    def native_value(self):
+        """Return the 95th percentile of the recent samples."""
+        return self._stats.p95
+
+    @property
+    def extra_state_attributes(self):
+        """Return the median and maximum of the recent samples."""
+        return {
+            "p50": self._stats.p50,
+            "max": self._stats.max,
+        }
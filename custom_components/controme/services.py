@@ -0,0 +1,107 @@
+"""Services of the Controme integration."""
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import voluptuous as vol
+
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import entity_registry as er
+
+from .const import DOMAIN
+from .coordinator import ContromeDataUpdateCoordinator, TargetKey
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_SET_TARGETS = "set_targets"
+ATTR_TARGETS = "targets"
+
+SET_TARGETS_SCHEMA = vol.Schema({
+    # Climate entity id, room id or "house_id/room_id" -> target temperature
+    vol.Required(ATTR_TARGETS): vol.All(
+        {cv.string: vol.All(vol.Coerce(float), vol.Range(min=5, max=30))},
+        vol.Length(min=1),
+    ),
+})
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services of the integration."""
+
+    async def _async_set_targets(call: ServiceCall) -> ServiceResponse:
+        """Set the target temperatures of many rooms with one refresh per controller."""
+        results: Dict[str, Dict[str, Any]] = {}
+        # Targets per coordinator, each controller gets one bulk write
+        writes: Dict[ContromeDataUpdateCoordinator, Dict[TargetKey, float]] = {}
+        requested: List[Tuple[str, ContromeDataUpdateCoordinator, TargetKey]] = []
+
+        for key, temperature in call.data[ATTR_TARGETS].items():
+            resolved, error = _resolve_room(hass, key)
+            if resolved is None:
+                results[key] = {"success": False, "error": error}
+                continue
+            coordinator, target_key = resolved
+            writes.setdefault(coordinator, {})[target_key] = temperature
+            requested.append((key, coordinator, target_key))
+
+        written = {
+            coordinator: await coordinator.async_set_targets(targets)
+            for coordinator, targets in writes.items()
+        }
+        for key, coordinator, target_key in requested:
+            success = written[coordinator][target_key]
+            results[key] = {
+                "house_id": target_key[0],
+                "room_id": target_key[1],
+                "temperature": writes[coordinator][target_key],
+                "success": success,
+            }
+            if not success:
+                results[key]["error"] = "write_failed"
+        return {"results": results}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_TARGETS,
+        _async_set_targets,
+        schema=SET_TARGETS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+def _resolve_room(
+    hass: HomeAssistant, key: str
+) -> Tuple[Optional[Tuple[ContromeDataUpdateCoordinator, TargetKey]], Optional[str]]:
+    """Find the coordinator and room of a climate entity id or room id."""
+    entries = hass.data.get(DOMAIN, {})
+
+    if key.startswith("climate."):
+        registry_entry = er.async_get(hass).async_get(key)
+        if registry_entry is None or registry_entry.platform != DOMAIN:
+            return None, "unknown_entity"
+        entry_data = entries.get(registry_entry.config_entry_id)
+        if entry_data is None:
+            return None, "not_loaded"
+        for room in entry_data["topology"].rooms:
+            if registry_entry.unique_id == f"{room.house_id}_{room.floor_id}_{room.room_id}_climate":
+                return (entry_data["coordinator"], (room.house_id, room.room_id)), None
+        return None, "unknown_entity"
+
+    house_id, _, room_id = key.rpartition("/")
+    matches = {
+        (entry_data["coordinator"], (room.house_id, room.room_id))
+        for entry_data in entries.values()
+        for room in entry_data["topology"].rooms
+        if str(room.room_id) == room_id and house_id in ("", room.house_id)
+    }
+    if not matches:
+        return None, "unknown_room"
+    if len(matches) > 1:
+        # The same room id exists in several houses
+        return None, "ambiguous_room"
+    return matches.pop(), None
@@ -0,0 +1,133 @@
+"""Room topology shared by the Controme platforms."""
+from dataclasses import dataclass
+import logging
+from typing import Any, FrozenSet, Iterable, List, Tuple
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity import DeviceInfo, Entity
+
+from .const import DOMAIN, VALUE_MAP
+from .models import ContromeSystem, RoomKey, TopologyElement
+
+_LOGGER = logging.getLogger(__name__)
+
+# Sensor types by the API key of their value
+SENSOR_TYPES_BY_FIELD = {data_key: sensor_type for sensor_type, data_key in VALUE_MAP.items()}
+
+
+@dataclass(slots=True)
+class ContromeRoomTopology:
+    """Static description of a room and the entities it provides."""
+
+    house_id: str
+    floor_id: Any
+    room_id: Any
+    name: str
+    device_info: DeviceInfo
+    # Sensor types from VALUE_MAP whose values the room reports
+    sensor_types: Tuple[str, ...]
+    # Names of the return flow sensors of the room
+    return_sensors: Tuple[str, ...]
+
+    @property
+    def key(self) -> RoomKey:
+        """Return the key of the room within the controller."""
+        return (self.house_id, self.floor_id, self.room_id)
+
+
+@dataclass(slots=True)
+class ContromeTopology:
+    """All rooms of the polled houses, rebuilt when rooms or sensors change."""
+
+    house_ids: List[str]
+    rooms: List[ContromeRoomTopology]
+    # Rooms and values missing for several polls, deleted from the registries
+    expired: FrozenSet[TopologyElement] = frozenset()
+
+    @property
+    def device_identifiers(self) -> set:
+        """Return the identifiers of the house hubs and all room devices."""
+        identifiers = {(DOMAIN, house_id) for house_id in self.house_ids}
+        for room in self.rooms:
+            identifiers.update(room.device_info["identifiers"])
+        return identifiers
+
+    @property
+    def entity_count(self) -> int:
+        """Return the number of room entities, one climate entity per room included."""
+        return sum(
+            1 + len(room.sensor_types) + len(room.return_sensors)
+            for room in self.rooms
+        )
+
+
+def build_topology(
+    system: ContromeSystem, expired: FrozenSet[TopologyElement] = frozenset()
+) -> ContromeTopology:
+    """Walk the floors and rooms of all houses once for all platforms."""
+    rooms = []
+    for house_id, house in system.houses.items():
+        for floor in house.floors:
+            for room in floor.rooms:
+                rooms.append(
+                    ContromeRoomTopology(
+                        house_id=house_id,
+                        floor_id=floor.id,
+                        room_id=room.id,
+                        name=room.name,
+                        device_info=DeviceInfo(
+                            identifiers={(DOMAIN, f"{house_id}_{floor.id}_{room.id}")},
+                            name=room.name,
+                            manufacturer="Controme",
+                            model="Room",
+                            via_device=(DOMAIN, house_id),
+                        ),
+                        sensor_types=tuple(
+                            sensor_type
+                            for sensor_type, data_key in VALUE_MAP.items()
+                            if room.has(data_key)
+                        ),
+                        return_sensors=tuple(room.return_sensors),
+                    )
+                )
+    return ContromeTopology(house_ids=list(system.houses), rooms=rooms, expired=expired)
+
+
+@callback
+def async_remove_entities(hass: HomeAssistant, entities: Iterable[Entity]) -> None:
+    """Remove entities of rooms or sensors missing from the latest poll.
+
+    The registry entries are kept, so a room that comes back keeps its
+    customizations; async_remove_expired deletes them once it is gone for good.
+    """
+    for entity in entities:
+        _LOGGER.debug("Removing %s", entity.entity_id)
+        hass.async_create_task(entity.async_remove())
+
+
+@callback
+def async_remove_expired(
+    hass: HomeAssistant, entry: ConfigEntry, topology: ContromeTopology
+) -> None:
+    """Delete entities and room devices that have been missing for several polls."""
+    entity_registry = er.async_get(hass)
+    device_registry = dr.async_get(hass)
+    for (house_id, floor_id, room_id), element in topology.expired:
+        prefix = f"{house_id}_{floor_id}_{room_id}"
+        if element is None:
+            # Detaching the device deletes its remaining entities as well
+            device = device_registry.async_get_device(identifiers={(DOMAIN, prefix)})
+            if device is not None and entry.entry_id in device.config_entries:
+                _LOGGER.debug("Removing device %s", device.name)
+                device_registry.async_update_device(
+                    device.id, remove_config_entry_id=entry.entry_id
+                )
+            continue
+        sensor_type = SENSOR_TYPES_BY_FIELD.get(element, element)
+        entity_id = entity_registry.async_get_entity_id("sensor", DOMAIN, f"{prefix}_{sensor_type}")
+        if entity_id is not None:
+            _LOGGER.debug("Removing %s from the registry", entity_id)
+            entity_registry.async_remove(entity_id)